@@ -33,11 +33,13 @@ db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 api = Api(app)
 
-from app import routes, result_model, errors
+from app import routes, result_model, transpilation_model, errors
 
 api.register_blueprint(routes.blp)
 app.redis = Redis.from_url(app.config['REDIS_URL'], port=5040)
-app.execute_queue = rq.Queue('cirq-service_execute', connection=app.redis, default_timeout=3600)
+app.execute_queue = rq.Queue('cirq-service_execute', connection=app.redis,
+                             default_timeout=app.config['MAX_JOB_TIMEOUT'])
+app.transpile_queue = rq.Queue('cirq-service_transpile', connection=app.redis, default_timeout=3600)
 app.logger.setLevel(logging.INFO)
 
 
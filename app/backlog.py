@@ -0,0 +1,118 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import json
+import time
+
+from rq.registry import StartedJobRegistry
+from rq.utils import utcnow, utcparse
+from rq.worker_registration import REDIS_WORKER_KEYS, WORKERS_BY_QUEUE_KEY
+
+from app import app
+
+# Redis hashes holding the estimated cost of every queued job of a queue by job id
+PENDING_WORK_KEY_PREFIX = 'cirq-service_pending_work:'
+
+# rough cost model of the state vector simulator in seconds
+SECONDS_PER_AMPLITUDE_UPDATE = 2e-9
+SECONDS_PER_MOMENT = 1e-4
+SECONDS_PER_SAMPLED_QUBIT = 1e-7
+
+
+def estimate_cost(shots=None, width=None, depth=None):
+    """Estimate the simulation time of a job in seconds from the size of its circuit. Jobs whose circuit is only
+    known once the implementation is prepared by the worker are estimated with DEFAULT_JOB_COST."""
+    if not width or not depth:
+        return app.config['DEFAULT_JOB_COST']
+    # every moment updates all amplitudes of the state vector, sampling is linear in the shots
+    return depth * (SECONDS_PER_MOMENT + 2 ** width * SECONDS_PER_AMPLITUDE_UPDATE) \
+        + (shots or 0) * width * SECONDS_PER_SAMPLED_QUBIT
+
+
+def estimate_transpilation_cost(transpilation, shots):
+    """Estimate the simulation time of a job executing a stored transpilation from its metrics."""
+    metrics = json.loads(transpilation.metrics or '{}')
+    return estimate_cost(shots, metrics.get('width'), metrics.get('depth'))
+
+
+def add_pending(queue, job_id, cost):
+    """Store the estimated cost of a job. Called after the job is queued, see get_backlog."""
+    app.redis.hset(PENDING_WORK_KEY_PREFIX + queue.name, job_id, cost)
+
+
+def remove_pending(queue_name, job_id):
+    app.redis.hdel(PENDING_WORK_KEY_PREFIX + queue_name, job_id)
+
+
+def get_backlog(queues):
+    """Return queue length, age of the oldest job in seconds, estimated pending work in seconds, number of workers,
+    busy workers, and worker utilization for every queue, and the totals over all queues. Reads everything with
+    two Redis round trips. The pending work is summed over the jobs still in the queue, and the estimates of jobs that
+    left it without being started, e.g., because they were removed or expired, are deleted."""
+    now = time.time()
+    pipeline = app.redis.pipeline()
+    for queue in queues:
+        pipeline.lrange(queue.key, 0, -1)
+        pipeline.hkeys(PENDING_WORK_KEY_PREFIX + queue.name)
+        pipeline.scard(WORKERS_BY_QUEUE_KEY % queue.name)
+        # jobs of crashed workers stay in the registry until they expire
+        pipeline.zcount(StartedJobRegistry(queue=queue).key, now, '+inf')
+    pipeline.scard(REDIS_WORKER_KEYS)
+    responses = pipeline.execute()
+    number_of_workers = responses.pop()
+
+    pipeline = app.redis.pipeline()
+    stale = []
+    for index, queue in enumerate(queues):
+        job_ids, estimated_job_ids = responses[4 * index:4 * index + 2]
+        if job_ids:
+            pipeline.hmget(PENDING_WORK_KEY_PREFIX + queue.name, job_ids)
+            pipeline.hget(queue.job_class.key_for(job_ids[0].decode()), 'enqueued_at')
+        # estimates are stored after their job is queued, so an estimate of a job not in the queue is stale
+        stale_job_ids = set(estimated_job_ids).difference(job_ids)
+        if stale_job_ids:
+            pipeline.hdel(PENDING_WORK_KEY_PREFIX + queue.name, *stale_job_ids)
+        stale.append(bool(stale_job_ids))
+    second_responses = iter(pipeline.execute())
+
+    backlog = []
+    for index, queue in enumerate(queues):
+        job_ids, _, workers, busy_workers = responses[4 * index:4 * index + 4]
+        pending_work = 0.0
+        oldest_job_age = 0.0
+        if job_ids:
+            costs, oldest_enqueued_at = next(second_responses), next(second_responses)
+            # jobs queued by an API process that did not store their estimate yet are not counted
+            pending_work = sum(float(cost) for cost in costs if cost is not None)
+            if oldest_enqueued_at:
+                oldest_job_age = max((utcnow() - utcparse(oldest_enqueued_at.decode())).total_seconds(), 0.0)
+        if stale[index]:
+            next(second_responses)
+        backlog.append({'name': queue.name, 'length': len(job_ids), 'oldest_job_age': oldest_job_age,
+                        'pending_work': pending_work, 'workers': workers, 'busy_workers': busy_workers,
+                        'utilization': min(busy_workers / workers, 1.0) if workers else 0.0})
+
+    busy_workers = sum(queue['busy_workers'] for queue in backlog)
+    return {'queues': backlog,
+            'length': sum(queue['length'] for queue in backlog),
+            'oldest_job_age': max((queue['oldest_job_age'] for queue in backlog), default=0.0),
+            'pending_work': sum(queue['pending_work'] for queue in backlog),
+            'workers': number_of_workers,
+            'busy_workers': busy_workers,
+            'utilization': min(busy_workers / number_of_workers, 1.0) if number_of_workers else 0.0}
@@ -16,14 +16,27 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 # ******************************************************************************
-from time import sleep
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import cirq
+import numpy as np
 from cirq import Simulator
 from cirq import Result
-from cirq.contrib.routing import gridqubits_to_graph_device
 import cirq_google
 
+from app import app, monitoring, routing
+
+# number of chunks the shots of a circuit with mid-circuit measurements are run in to report the progress
+PROGRESS_CHUNKS = 20
+
+# process pool for transpiling a circuit for several qpus at once, created on first use in the process using it
+_transpile_pool = None
+_transpile_pool_pid = None
+
 
 def get_qpu_spec(qpu):
     """Get backend."""
@@ -35,11 +48,11 @@ def get_qpu_spec(qpu):
         raise NotImplementedError("qpu not supported")
 
 
-def get_backend(qpu):
+def get_backend(qpu, seed=None):
     if qpu.lower() == "local-simulator":
-        return Simulator()
+        return Simulator(seed=seed)
     elif qpu.lower() == "sycamore" or qpu.lower() == "sycamore23":
-        return Simulator()
+        return Simulator(seed=seed)
     else:
         raise NotImplementedError("qpu not supported")
 
@@ -49,8 +62,9 @@ def delete_token():
     pass
 
 
-def transpile_for_qpu(qpu, circuit):
-    # TODO: Mapping to device specific QBITS
+def decompose_for_qpu(qpu, circuit):
+    """Decompose the circuit into the native gates of the qpu. The simulators execute this circuit, as routing it
+    would only add the qubits the SWAP gates pass through."""
     if qpu.lower() == "local-simulator":
         return circuit
     else:
@@ -58,15 +72,249 @@ def transpile_for_qpu(qpu, circuit):
         return cirq.optimize_for_target_gateset(circuit, gateset=device.metadata.compilation_target_gatesets[0])
 
 
-def execute_job(transpiled_circuit, shots, backend):
-    """Execute and Simulate Job on simulator and return results"""
+def transpile_for_qpu(qpu, circuit):
+    """Decompose the circuit into the native gates of the qpu, place it on the qubits of the device, and route it.
+    Return the transpiled circuit and the routing time and number of inserted SWAP gates."""
+    if qpu.lower() == "local-simulator":
+        return circuit, {'routing_time': 0.0, 'number_of_swaps': 0}
+    else:
+        device = get_qpu_spec(qpu)
+        gateset = device.metadata.compilation_target_gatesets[0]
+        decomposed_circuit = decompose_for_qpu(qpu, circuit)
+
+        start = time.perf_counter()
+        routed_circuit, number_of_swaps = routing.route_circuit(decomposed_circuit,
+                                                                routing.get_device_graph(qpu, device, gateset))
+        routing_time = time.perf_counter() - start
+        return routed_circuit, {'routing_time': routing_time, 'number_of_swaps': number_of_swaps}
+
+
+def transpile_for_qpus(qpu_names, circuit):
+    """Transpile the circuit for all given qpus concurrently in a process pool.
+    Return the metrics and the transpiled Cirq-JSON circuit, or an error, for every qpu."""
+    try:
+        cirq_json = cirq.to_json(circuit)
+    except Exception:
+        # circuits with gates that cannot be serialized are transpiled one after another in this process
+        return [_transpile_target(qpu_name, circuit) for qpu_name in qpu_names]
+
+    for attempt in range(2):
+        try:
+            return list(_get_transpile_pool().map(_transpile_target, qpu_names, [cirq_json] * len(qpu_names)))
+        except BrokenProcessPool:
+            # a child process died, e.g., ran out of memory, which breaks the whole pool
+            logging.warning('Transpilation pool broke, replacing it')
+            _reset_transpile_pool()
+    return [{'qpu_name': qpu_name, 'error': 'transpilation failed'} for qpu_name in qpu_names]
 
-    result: Result = backend.run(transpiled_circuit, repetitions=shots)
+
+def _get_transpile_pool():
+    global _transpile_pool, _transpile_pool_pid
+    # a pool inherited through fork belongs to the parent process and cannot be used
+    if _transpile_pool is None or _transpile_pool_pid != os.getpid():
+        _transpile_pool = ProcessPoolExecutor(max_workers=app.config['TRANSPILE_POOL_SIZE'])
+        _transpile_pool_pid = os.getpid()
+    return _transpile_pool
+
+
+def _reset_transpile_pool():
+    global _transpile_pool
+    if _transpile_pool is not None:
+        _transpile_pool.shutdown(wait=False)
+        _transpile_pool = None
+
+
+def _transpile_target(qpu_name, circuit):
+    if isinstance(circuit, str):
+        circuit = cirq.read_json(json_text=circuit)
+    try:
+        transpiled_circuit, routing_metrics = transpile_for_qpu(qpu_name, circuit)
+        metrics = dict(get_circuit_metrics(transpiled_circuit), **routing_metrics)
+    except NotImplementedError:
+        return {'qpu_name': qpu_name, 'error': 'Unsupported qpu'}
+    except Exception:
+        return {'qpu_name': qpu_name, 'error': 'transpilation failed'}
+    return dict(metrics, qpu_name=qpu_name, transpiled_cirq_json=cirq.to_json(transpiled_circuit, indent=4))
+
+
+def execute_job(transpiled_circuit, shots, backend, timer=None, progress=None, mitigate=None):
+    """Execute and Simulate Job on simulator and return results. If given, progress is called with the fraction of
+    the simulation that is done, and mitigate is called with the histogram and its measurement keys to correct
+    readout errors."""
+    timer = timer or monitoring.StageTimer()
+
+    with timer.stage('simulate'):
+        result: Result = run_circuit(transpiled_circuit, shots, backend, progress)
 
     def fold(l):
         return ''.join(str(e[0]) for e in l)
 
-    stats = result.measurements
-    histogram = result.multi_measurement_histogram(keys=stats.keys(), fold_func=fold)
-    print(histogram)
-    return histogram
\ No newline at end of file
+    with timer.stage('histogram'):
+        stats = result.measurements
+        histogram = result.multi_measurement_histogram(keys=stats.keys(), fold_func=fold)
+    if mitigate:
+        with timer.stage('mitigate'):
+            histogram = mitigate(histogram, list(stats.keys()))
+    return histogram
+
+
+def run_circuit(circuit, shots, backend, progress=None):
+    """Sample the circuit, group by group if its qubits do not all interact, and return the result."""
+    components = split_circuit(circuit)
+    if components is not None:
+        return run_components(components, shots, backend, progress)
+    elif progress and not circuit.are_all_measurements_terminal():
+        # every repetition is simulated on its own anyway, so running the shots in chunks costs nothing
+        return run_in_chunks(circuit, shots, backend, progress)
+    else:
+        return backend.run(circuit, repetitions=shots)
+
+
+def split_circuit(circuit):
+    """Split the circuit into sub-circuits on the groups of qubits that never interact with each other.
+    Groups without measurements are dropped, as they do not influence the result. Return the sub-circuits together
+    with the position of their measured qubits in the measurement keys of the circuit, or None if the circuit cannot
+    be split, e.g., because it consists of a single group or uses classical control."""
+    qubit_groups = {qubit: qubit for qubit in circuit.all_qubits()}
+
+    def find(qubit):
+        while qubit_groups[qubit] != qubit:
+            qubit_groups[qubit] = qubit_groups[qubit_groups[qubit]]
+            qubit = qubit_groups[qubit]
+        return qubit
+
+    operations = list(circuit.all_operations())
+    measurement_keys = set()
+    for operation in operations:
+        if cirq.control_keys(operation):
+            return None
+        if cirq.is_measurement(operation):
+            gate = operation.gate
+            # repeated keys and confusion maps would couple the records of several groups
+            if not isinstance(gate, cirq.MeasurementGate) or gate.confusion_map or gate.key in measurement_keys:
+                return None
+            measurement_keys.add(gate.key)
+        else:
+            for qubit in operation.qubits[1:]:
+                qubit_groups[find(qubit)] = find(operation.qubits[0])
+
+    groups = {find(qubit) for qubit in qubit_groups}
+    if len(groups) < 2:
+        return None
+
+    group_operations = {group: [] for group in groups}
+    # measurement key -> (number of measured qubits, [(group, positions of the qubits of the group in the key)])
+    layout = {}
+    for operation in operations:
+        if not operation.qubits:
+            # global phases do not change the measurement results
+            continue
+        if not cirq.is_measurement(operation):
+            group_operations[find(operation.qubits[0])].append(operation)
+            continue
+        gate = operation.gate
+        positions = {}
+        for position, qubit in enumerate(operation.qubits):
+            positions.setdefault(find(qubit), []).append(position)
+        layout[gate.key] = (len(operation.qubits), list(positions.items()))
+        for group, group_positions in positions.items():
+            invert_mask = tuple(position < len(gate.invert_mask) and gate.invert_mask[position]
+                                for position in group_positions)
+            group_operations[group].append(cirq.measure(*[operation.qubits[position] for position in group_positions],
+                                                        key=gate.key, invert_mask=invert_mask))
+
+    measured_groups = {group for _, key_positions in layout.values() for group, _ in key_positions}
+    # sample the groups in a fixed order, so seeded simulations are reproducible
+    circuits = {group: cirq.Circuit(group_operations[group]) for group in sorted(measured_groups)}
+    return circuits, layout
+
+
+def run_components(components, shots, backend, progress=None):
+    """Sample the sub-circuits of a split circuit independently and combine their measurement records into the
+    result of the whole circuit."""
+    circuits, layout = components
+    group_results = {}
+    for number, (group, circuit) in enumerate(circuits.items(), 1):
+        group_results[group] = backend.run(circuit, repetitions=shots).measurements
+        if progress:
+            progress(number / len(circuits))
+
+    measurements = {}
+    for key, (number_of_qubits, key_positions) in layout.items():
+        first_group = key_positions[0][0]
+        record = np.empty((shots, number_of_qubits), dtype=group_results[first_group][key].dtype)
+        for group, positions in key_positions:
+            record[:, positions] = group_results[group][key]
+        measurements[key] = record
+    return cirq.ResultDict(params=cirq.ParamResolver({}), measurements=measurements)
+
+
+def run_in_chunks(circuit, shots, backend, progress):
+    """Run the shots of the circuit in PROGRESS_CHUNKS chunks and report the progress after every chunk."""
+    records = {}
+    chunk_size = max(1, -(-shots // PROGRESS_CHUNKS))
+    done = 0
+    while done < shots:
+        repetitions = min(chunk_size, shots - done)
+        for key, record in backend.run(circuit, repetitions=repetitions).records.items():
+            records.setdefault(key, []).append(record)
+        done += repetitions
+        progress(done / shots)
+    return cirq.ResultDict(params=cirq.ParamResolver({}),
+                           records={key: np.concatenate(chunks) for key, chunks in records.items()})
+
+
+def simulate_array(transpiled_circuit, result_type, backend, timer=None):
+    """Simulate the circuit without its terminal measurements and return the final state vector, or the unitary of
+    the circuit, together with the order of the qubits the array refers to."""
+    timer = timer or monitoring.StageTimer()
+    circuit = cirq.drop_terminal_measurements(transpiled_circuit)
+    qubits = sorted(circuit.all_qubits())
+
+    with timer.stage('simulate'):
+        if result_type == 'unitary':
+            # raises a ValueError for circuits with mid-circuit measurements or other non-unitary operations
+            array = cirq.unitary(circuit)
+        else:
+            array = backend.simulate(circuit, qubit_order=qubits).final_state_vector
+    return array, [str(qubit) for qubit in qubits]
+
+
+def get_circuit_metrics(transpiled_circuit):
+    """Return depth, width and gate counts of the given (transpiled) circuit."""
+    # count number of gates, multi qubit gates and measurements operation, by iterating over all operations
+    number_of_multi_qubit_gates = 0
+    number_of_measurement_operations = 0
+    total_number_of_gates = 0
+    for operation in transpiled_circuit.all_operations():
+        if type(operation) is cirq.GateOperation:
+            total_number_of_gates += 1
+            if cirq.is_measurement(operation):
+                number_of_measurement_operations += 1
+            elif len(operation.qubits) > 1:
+                number_of_multi_qubit_gates += 1
+
+    # width: the amount of qubits
+    width = len(transpiled_circuit.all_qubits())
+
+    # gate_depth: the longest subsequence of compiled instructions where adjacent instructions share resources
+    # Cirq packs gates as tight as possible in new circuits, the number of moments then is equal to the depth
+    depth = len(cirq.Circuit(transpiled_circuit.all_operations()))
+
+    # multi_qubit_gate_depth: Maximum number of successive two-qubit gates in the native cirq program;
+    multi_qubit_gate_depth = len(cirq.Circuit([i for i in transpiled_circuit.all_operations()
+                                               if len(i.qubits) > 1]))
+
+    # count number of single qubit gates
+    number_of_single_qubit_gates = total_number_of_gates - number_of_multi_qubit_gates
+
+    # count total number of all operations including gates and measurement operations
+    total_number_of_operations = total_number_of_gates + number_of_measurement_operations
+
+    return {'depth': depth,
+            'multi_qubit_gate_depth': multi_qubit_gate_depth,
+            'width': width,
+            'total_number_of_operations': total_number_of_operations,
+            'number_of_single_qubit_gates': number_of_single_qubit_gates,
+            'number_of_multi_qubit_gates': number_of_multi_qubit_gates,
+            'number_of_measurement_operations': number_of_measurement_operations}
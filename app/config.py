@@ -28,6 +28,40 @@ class Config(object):
 
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:5040'
 
+    # number of processes transpiling a circuit for several qpus at once
+    TRANSPILE_POOL_SIZE = int(os.environ.get('TRANSPILE_POOL_SIZE') or 3)
+
+    # user implementations run in a pool of child processes with the following limits
+    SANDBOX_ENABLED = os.environ.get('SANDBOX_ENABLED', 'true').lower() == 'true'
+    SANDBOX_POOL_SIZE = int(os.environ.get('SANDBOX_POOL_SIZE') or 2)
+    SANDBOX_TIMEOUT = int(os.environ.get('SANDBOX_TIMEOUT') or 60)
+    SANDBOX_CPU_SECONDS = int(os.environ.get('SANDBOX_CPU_SECONDS') or 60)
+    SANDBOX_MEMORY_MB = int(os.environ.get('SANDBOX_MEMORY_MB') or 4096)
+    SANDBOX_MAX_JOBS_PER_WORKER = int(os.environ.get('SANDBOX_MAX_JOBS_PER_WORKER') or 50)
+
+    # upper limit for the timeout of an execution job in seconds, also used if a request does not set a timeout
+    MAX_JOB_TIMEOUT = int(os.environ.get('MAX_JOB_TIMEOUT') or 3600)
+
+    # maximum number of circuits in a bundle that is executed by a single job
+    MAX_BUNDLE_SIZE = int(os.environ.get('MAX_BUNDLE_SIZE') or 1000)
+
+    # estimated simulation time in seconds of queued jobs whose circuit is not known before the worker prepares it
+    DEFAULT_JOB_COST = float(os.environ.get('DEFAULT_JOB_COST') or 1.0)
+
+    # readout calibration matrices are cached per backend, noise model, and qubit for CALIBRATION_TTL seconds,
+    # CALIBRATION_SHOTS is used for qubits that are calibrated on the fly to mitigate the readout errors of a job
+    CALIBRATION_TTL = int(os.environ.get('CALIBRATION_TTL') or 3600)
+    CALIBRATION_SHOTS = int(os.environ.get('CALIBRATION_SHOTS') or 8192)
+
+    # number of histograms of seeded executions kept in Redis, the least recently used are evicted first, 0 disables
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE') or 1000)
+
+    # directory for the state vectors, unitaries, and probabilities that are too large to be returned as JSON
+    RESULT_DATA_DIR = os.environ.get('RESULT_DATA_DIR') or os.path.join(basedir, 'results')
+
+    # number of job completions that are collected in Redis before they are written to the database together
+    RESULT_BUFFER_SIZE = int(os.environ.get('RESULT_BUFFER_SIZE') or 1)
+
     API_TITLE = "Cirq Service API"
     API_VERSION = "1.0"
     OPENAPI_VERSION = "3.0.2"
@@ -17,6 +17,7 @@
 #  limitations under the License.
 # ******************************************************************************
 import urllib
+import base64
 from urllib import request, error
 import tempfile
 import os, sys, shutil
@@ -26,11 +27,20 @@ from flask_restful import abort
 import cirq
 from urllib3 import HTTPResponse
 
-from app import app
+from app import app, monitoring, profiling, sandbox
 
 
 def prepare_code_from_data(data, input_params):
-    """Get implementation code from data. Set input parameters into implementation. Return circuit."""
+    """Get implementation code from data. Set input parameters into implementation. Return circuit.
+    The implementation runs in a resource-limited sandbox process, unless the sandbox is disabled."""
+    if app.config['SANDBOX_ENABLED']:
+        # a profiled job only records the wait for the sandbox, so the sandbox profiles the implementation itself
+        return sandbox.run(data, input_params, *profiling.get_options())
+    return run_implementation(data, input_params)
+
+
+def run_implementation(data, input_params):
+    """Import the implementation code in this process and return its circuit."""
     temp_dir = tempfile.mkdtemp()
     with open(os.path.join(temp_dir, "__init__.py"), "w") as f:
         f.write("")
@@ -86,6 +96,39 @@ def prepare_code_from_cirq_url(url, bearer_token: str = ""):
     return prepare_code_from_cirq_json(impl)
 
 
+def prepare_circuit(impl_url, impl_data, impl_language, input_params, bearer_token: str = "", timer=None):
+    """Get circuit either from URL or from base64 encoded data, depending on the implementation language.
+    Return circuit or None if no implementation was given."""
+    impl = get_implementation(impl_url, impl_data, bearer_token, timer)
+    if not impl:
+        return None
+    return prepare_implementation(impl, impl_language, input_params, timer)
+
+
+def get_implementation(impl_url, impl_data, bearer_token: str = "", timer=None):
+    """Get implementation code either from URL or from base64 encoded data. Return code or None if no implementation
+    was given or it could not be downloaded."""
+    timer = timer or monitoring.StageTimer()
+    if impl_url:
+        with timer.stage('download'):
+            try:
+                return _download_code(impl_url, bearer_token)
+            except (error.HTTPError, error.URLError):
+                return None
+    elif impl_data:
+        return base64.b64decode(impl_data.encode()).decode()
+    return None
+
+
+def prepare_implementation(impl, impl_language, input_params, timer=None):
+    """Set input parameters into the implementation code, depending on the implementation language. Return circuit."""
+    timer = timer or monitoring.StageTimer()
+    with timer.stage('prepare'):
+        if impl_language.lower() == 'cirq-json':
+            return prepare_code_from_cirq_json(impl)
+        return prepare_code_from_data(impl, input_params)
+
+
 def _download_code(url: str, bearer_token: str = "") -> str:
     req = request.Request(url)
 
@@ -0,0 +1,158 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import json
+import re
+
+import cirq
+import numpy as np
+
+from app import app, cirq_handler, monitoring
+
+# Redis keys of the cached calibration matrices, one per backend, noise model, and qubit
+CALIBRATION_KEY_PREFIX = 'cirq-service_calibration:'
+
+# histograms of up to this many bits are corrected with the full tensored inverse, larger histograms on the
+# subspace of the observed bitstrings
+DENSE_MITIGATION_BITS = 16
+
+# number of rows of the correction matrix of the observed bitstrings that are computed at once
+SPARSE_MITIGATION_CHUNK_SIZE = 256
+
+QUBIT_NAME = re.compile(r'^q\((-?\d+)(?:, ?(-?\d+))?\)$')
+
+
+def parse_qubit(name):
+    """Return the qubit for its string representation, e.g., q(0) for a LineQubit and q(4, 5) for a GridQubit."""
+    match = QUBIT_NAME.match(name.strip())
+    if not match:
+        return cirq.NamedQubit(name)
+    if match.group(2) is None:
+        return cirq.LineQubit(int(match.group(1)))
+    return cirq.GridQubit(int(match.group(1)), int(match.group(2)))
+
+
+def calibrate(qubits, shots, backend):
+    """Return the readout calibration matrix of every qubit by its name. The matrices are tensored, i.e., every
+    qubit is calibrated on its own, which needs two circuits for any number of qubits instead of 2^n."""
+    names = [str(qubit) for qubit in qubits]
+    measurements = [cirq.measure(qubit, key=name) for qubit, name in zip(qubits, names)]
+    # qubits without two-qubit gates are sampled one by one, so the circuits stay cheap for large qubit sets,
+    # both circuits have a preparation moment, so noise models see the same structure for both states
+    prepared_zero = cirq_handler.run_circuit(cirq.Circuit(cirq.I.on_each(*qubits), measurements), shots,
+                                             backend).measurements
+    prepared_one = cirq_handler.run_circuit(cirq.Circuit(cirq.X.on_each(*qubits), measurements), shots,
+                                            backend).measurements
+
+    matrices = {}
+    for name in names:
+        one_given_zero = prepared_zero[name].mean()
+        one_given_one = prepared_one[name].mean()
+        # column j holds the probabilities to read 0 and 1 if the qubit was prepared in state j
+        matrices[name] = np.array([[1 - one_given_zero, 1 - one_given_one], [one_given_zero, one_given_one]])
+    return matrices
+
+
+def get_calibration_matrices(qpu_name, backend, qubits, shots=None, refresh=False):
+    """Return the calibration matrices of the qubits by their names. Matrices are cached in Redis per backend and
+    noise model for CALIBRATION_TTL seconds, only qubits without a cached matrix are calibrated."""
+    names = [str(qubit) for qubit in qubits]
+    prefix = CALIBRATION_KEY_PREFIX + hashlib.sha256(
+        json.dumps([qpu_name.lower(), repr(backend.noise)]).encode()).hexdigest() + ':'
+
+    matrices = {}
+    if names and not refresh:
+        for name, entry in zip(names, app.redis.mget([prefix + name for name in names])):
+            if entry is not None:
+                matrices[name] = np.array(json.loads(entry))
+        monitoring.observe_cache_lookup('calibration', len(matrices) == len(names))
+
+    missing = [qubit for qubit, name in zip(qubits, names) if name not in matrices]
+    if missing:
+        calibrated = calibrate(missing, shots or app.config['CALIBRATION_SHOTS'], backend)
+        pipeline = app.redis.pipeline()
+        for name, matrix in calibrated.items():
+            pipeline.setex(prefix + name, app.config['CALIBRATION_TTL'], json.dumps(matrix.tolist()))
+        pipeline.execute()
+        matrices.update(calibrated)
+    return matrices
+
+
+def get_readout_qubits(circuit):
+    """Return the qubit of every bit of the histogram, i.e., the first qubit of every measurement key, by key,
+    together with whether the measurement inverts its result."""
+    readout_qubits = {}
+    for operation in circuit.all_operations():
+        if cirq.is_measurement(operation) and isinstance(operation.gate, cirq.MeasurementGate):
+            gate = operation.gate
+            readout_qubits[gate.key] = (operation.qubits[0], bool(gate.invert_mask and gate.invert_mask[0]))
+    return readout_qubits
+
+
+def readout_matrix(matrix, inverted=False):
+    """Return the calibration matrix of a bit, which is the calibration matrix of its qubit with both outcomes
+    swapped if the measurement inverts the result."""
+    return matrix[::-1, ::-1] if inverted else matrix
+
+
+def mitigate(histogram, matrices, shots):
+    """Correct the readout errors of the histogram with the inverses of the calibration matrices of its bits and
+    return the corrected counts. Negative quasi-probabilities are clipped, so the counts sum up to the shots."""
+    if not histogram or not matrices:
+        return histogram
+    bitstrings = list(histogram)
+    bits = (np.frombuffer(''.join(bitstrings).encode(), dtype=np.uint8) - ord('0')).reshape(len(bitstrings), -1)
+    probabilities = np.array([histogram[bitstring] for bitstring in bitstrings], dtype=float)
+    probabilities /= probabilities.sum()
+    inverses = [np.linalg.pinv(matrix) for matrix in matrices]
+
+    if bits.shape[1] <= DENSE_MITIGATION_BITS:
+        corrected = _mitigate_dense(bits, probabilities, inverses)
+        bits = np.array(np.nonzero(corrected > 0)).T
+        corrected = corrected[tuple(bits.T)]
+    else:
+        corrected = np.clip(_mitigate_sparse(bits, probabilities, inverses), 0, None)
+
+    if corrected.sum() <= 0:
+        return histogram
+    corrected = np.round(corrected * (shots / corrected.sum()), 6)
+    return {''.join(map(str, bitstring)): float(count) for bitstring, count in zip(bits.tolist(), corrected)
+            if count > 0}
+
+
+def _mitigate_dense(bits, probabilities, inverses):
+    """Apply the tensored inverse to the full probability vector, one bit at a time."""
+    vector = np.zeros((2,) * bits.shape[1])
+    vector[tuple(bits.T)] = probabilities
+    for axis, inverse in enumerate(inverses):
+        vector = np.moveaxis(np.tensordot(inverse, vector, axes=([1], [axis])), 0, axis)
+    return np.clip(vector, 0, None)
+
+
+def _mitigate_sparse(bits, probabilities, inverses):
+    """Apply the tensored inverse restricted to the observed bitstrings, chunk by chunk of rows."""
+    corrected = np.empty(len(bits))
+    for start in range(0, len(bits), SPARSE_MITIGATION_CHUNK_SIZE):
+        rows = bits[start:start + SPARSE_MITIGATION_CHUNK_SIZE]
+        block = np.ones((len(rows), len(bits)))
+        for bit, inverse in enumerate(inverses):
+            block *= inverse[rows[:, bit][:, None], bits[:, bit][None, :]]
+        corrected[start:start + SPARSE_MITIGATION_CHUNK_SIZE] = block @ probabilities
+    return corrected
@@ -0,0 +1,147 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import atexit
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, generate_latest, \
+    CONTENT_TYPE_LATEST, multiprocess, values
+
+# pid of the RQ worker process, if this process is one or one of its work horses
+_worker_pid = None
+
+
+def _process_identifier():
+    """Identify the metric files of this process. RQ forks a work horse for every job, so the work horses of a worker
+    share one set of files, which they use one after another, instead of leaving files behind for every job."""
+    if _worker_pid is not None and os.getpid() != _worker_pid:
+        return _work_horse_identifier()
+    return os.getpid()
+
+
+def _work_horse_identifier():
+    return '{}-horse'.format(_worker_pid)
+
+
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    # has to be set before the metrics below are created
+    values.ValueClass = values.MultiProcessValue(_process_identifier)
+
+STAGE_DURATION = Histogram('cirq_service_stage_duration_seconds', 'Duration of the stages of a job', ['stage'],
+                           buckets=(.001, .005, .01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600))
+QUEUE_WAIT = Histogram('cirq_service_queue_wait_seconds', 'Time a job waited in the queue before it started',
+                       ['queue'], buckets=(.01, .05, .1, .5, 1, 5, 10, 30, 60, 300, 900, 3600))
+QUEUE_DEPTH = Gauge('cirq_service_queue_depth', 'Number of jobs waiting in the queue', ['queue'],
+                    multiprocess_mode='livemax')
+QUEUE_OLDEST_JOB_AGE = Gauge('cirq_service_queue_oldest_job_age_seconds', 'Time the oldest job waits in the queue',
+                             ['queue'], multiprocess_mode='livemax')
+QUEUE_PENDING_WORK = Gauge('cirq_service_queue_pending_work_seconds',
+                           'Estimated simulation time of the jobs waiting in the queue', ['queue'],
+                           multiprocess_mode='livemax')
+QUEUE_WORKERS = Gauge('cirq_service_queue_workers', 'Number of workers listening on the queue', ['queue'],
+                      multiprocess_mode='livemax')
+QUEUE_WORKER_UTILIZATION = Gauge('cirq_service_queue_worker_utilization',
+                                 'Fraction of the workers of the queue that are executing a job', ['queue'],
+                                 multiprocess_mode='livemax')
+CACHE_LOOKUPS = Counter('cirq_service_cache_lookups_total', 'Cache lookups by cache and outcome',
+                        ['cache', 'outcome'])
+CIRCUIT_QUBITS = Histogram('cirq_service_circuit_qubits', 'Number of qubits of executed circuits',
+                           buckets=(1, 2, 4, 8, 12, 16, 20, 24, 28, 32, 40, 54))
+CIRCUIT_DEPTH = Histogram('cirq_service_circuit_depth', 'Depth of executed circuits',
+                          buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000))
+JOB_SHOTS = Histogram('cirq_service_job_shots', 'Number of shots of executed circuits',
+                      buckets=(1, 10, 100, 1000, 10000, 100000, 1000000))
+
+
+class StageTimer:
+    """Measures the stages of a single job. Every stage is observed in the stage histogram and kept per job,
+    so the timings can be stored with the result."""
+
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        # called with the name of every stage when it starts, e.g., to report the progress of a job
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        if self.on_stage:
+            self.on_stage(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + duration
+            STAGE_DURATION.labels(name).observe(duration)
+
+
+def register_worker():
+    """Called in an RQ worker process before it forks work horses. Its work horses then write their metrics to
+    shared files, and the live gauges of the worker are removed when it exits."""
+    global _worker_pid
+    _worker_pid = os.getpid()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        atexit.register(mark_process_dead, _worker_pid)
+        atexit.register(mark_process_dead, _work_horse_identifier())
+
+
+def mark_process_dead(pid):
+    """Remove the live gauges of a terminated process, e.g., a gunicorn worker, from the multiprocess directory."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+def observe_queue_wait(job):
+    """Record how long the given RQ job waited between being enqueued and being started."""
+    if job is not None and job.enqueued_at and job.started_at:
+        QUEUE_WAIT.labels(job.origin).observe((job.started_at - job.enqueued_at).total_seconds())
+
+
+def observe_backlog(backlog):
+    """Set the queue gauges from the backlog of all queues."""
+    for queue in backlog['queues']:
+        QUEUE_DEPTH.labels(queue['name']).set(queue['length'])
+        QUEUE_OLDEST_JOB_AGE.labels(queue['name']).set(queue['oldest_job_age'])
+        QUEUE_PENDING_WORK.labels(queue['name']).set(queue['pending_work'])
+        QUEUE_WORKERS.labels(queue['name']).set(queue['workers'])
+        QUEUE_WORKER_UTILIZATION.labels(queue['name']).set(queue['utilization'])
+
+
+def observe_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def observe_circuit(width, depth, shots):
+    CIRCUIT_QUBITS.observe(width)
+    CIRCUIT_DEPTH.observe(depth)
+    JOB_SHOTS.observe(shots)
+
+
+def generate_metrics():
+    """Return the current metrics in the Prometheus text format together with its content type.
+    If PROMETHEUS_MULTIPROC_DIR is set, the metrics of all API and worker processes sharing that directory
+    are collected."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -17,9 +17,55 @@
 #  limitations under the License.
 # ******************************************************************************
 
+import json
+
+import numpy as np
+
+
+def _to_array(dtype):
+    """Returns a converter decoding a list, a JSON array, or comma separated values to a NumPy array"""
+    def convert(value):
+        if isinstance(value, str):
+            value = value.strip()
+            value = json.loads(value) if value.startswith('[') else [v for v in value.split(',') if v.strip()]
+        return np.asarray(value, dtype=dtype)
+    return convert
+
+
+def _to_complex(value):
+    if isinstance(value, str):
+        return complex(value.replace(' ', ''))
+    return complex(value)
+
+
+def _to_json(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+class ParameterError(ValueError):
+    """
+    A parameter could not be converted to its declared type
+    """
+    def __init__(self, key, type, message):
+        super().__init__(f"Parameter '{key}' of type '{type}': {message}")
+        self.key = key
+        self.type = type
+        self.message = message
+
+    def __reduce__(self):
+        return ParameterError, (self.key, self.type, self.message)
+
+    def to_json(self):
+        return {'parameter': self.key, 'type': self.type, 'error': self.message}
+
 
 class ParameterDictionary(dict):
 
+    """
+    Parameters that could not be converted
+    """
+    errors = ()
+
     """
     Definition of supported parameter types
     """
@@ -27,52 +73,144 @@ class ParameterDictionary(dict):
         "String" : str,
         "Integer" : int,
         "Float" : float,
+        "Complex" : _to_complex,
+        "Json" : _to_json,
+        "FloatArray" : _to_array(np.float64),
+        "IntegerArray" : _to_array(np.int64),
         "Unknown" : str
     }
 
     """
-        Converts a given parameter type definition pair to a parameter of the defined type. 
+        Types whose values can be converted for many parameter sets at once by NumPy
     """
-    @classmethod
-    def __convert_to_typed_parameter(cls, parameter):
+    __vectorized_types = {
+        "Integer" : np.int64,
+        "Float" : np.float64
+    }
 
-        if not isinstance(parameter, dict):
-            return None
+    """
+        Converts a given parameter type definition pair to a parameter of the defined type.
+        Raises a ParameterError if that is not possible.
+    """
+    @classmethod
+    def __convert_to_typed_parameter(cls, key, parameter):
 
-        if "rawValue" not in parameter or "type" not in parameter:
-            return None
+        if not isinstance(parameter, dict) or "rawValue" not in parameter or "type" not in parameter:
+            raise ParameterError(key, None, "expected an object with 'rawValue' and 'type'")
 
+        t = ParameterDictionary.__parameter_types.get(parameter['type'])
+        if t is None:
+            raise ParameterError(key, parameter['type'], "unsupported type")
         try:
-            t = ParameterDictionary.__parameter_types[parameter['type']]
-            value = parameter['rawValue']
-            return t(value)
-        except:
-            return None
+            return t(parameter['rawValue'])
+        except (TypeError, ValueError, OverflowError) as e:
+            raise ParameterError(key, parameter['type'], str(e))
 
     """
-        Initializes a typed parameter dictionary from the given raw dictionary
+        Initializes a typed parameter dictionary from the given raw dictionary.
+        Parameters that cannot be converted are set to None and listed in errors.
     """
-    def __init__(self, other: dict):
+    def __init__(self, other: dict = None):
+        super(ParameterDictionary, self).__init__()
+        self.errors = []
 
         # Convert all the entries to typed entries
-        for k, v in other.items():
-            typed_value = ParameterDictionary.__convert_to_typed_parameter(v)
-            self[k] = typed_value
+        convert = ParameterDictionary.__convert_to_typed_parameter
+        for k, v in (other or {}).items():
+            try:
+                typed_value = convert(k, v)
+            except ParameterError as e:
+                self.errors.append(e)
+                typed_value = None
+            dict.__setitem__(self, k.lower(), typed_value)
+
+    """
+        Converts many raw parameter dictionaries at once, e.g., the parameter sets of a sweep.
+        Parameter sets with the same keys share one schema and are converted column by column, Integer and Float
+        parameters by NumPy.
+        Returns the typed dictionaries and a list of errors with the index of the parameter set they belong to.
+    """
+    @classmethod
+    def convert_batch(cls, parameter_sets):
+        results = [None] * len(parameter_sets)
+        errors = []
+
+        schemas = {}
+        for i, raw in enumerate(parameter_sets):
+            schemas.setdefault(tuple(raw) if isinstance(raw, dict) else None, []).append(i)
+
+        for schema, indices in schemas.items():
+            if schema is None:
+                for i in indices:
+                    results[i] = cls({})
+                    results[i].errors.append(ParameterError(None, None, "expected an object of parameters"))
+                continue
+
+            columns = [cls.__convert_column(key, [parameter_sets[i][key] for i in indices]) for key in schema]
+            has_errors = any(isinstance(value, ParameterError) for column in columns for value in column)
+            keys = [key.lower() for key in schema]
+            rows = zip(*columns) if columns else [()] * len(indices)
+            for i, row in zip(indices, rows):
+                typed = cls.__new__(cls)
+                if has_errors:
+                    typed.errors = [value for value in row if isinstance(value, ParameterError)]
+                    row = [None if isinstance(value, ParameterError) else value for value in row]
+                dict.update(typed, zip(keys, row))
+                results[i] = typed
+
+        for i, typed in enumerate(results):
+            errors.extend(dict(e.to_json(), index=i) for e in typed.errors)
+        return results, errors
+
+    """
+        Converts the values of one parameter of many parameter sets. Values that cannot be converted are
+        replaced by their ParameterError.
+    """
+    @classmethod
+    def __convert_column(cls, key, parameters):
+        try:
+            types = {parameter['type'] for parameter in parameters}
+            if len(types) == 1:
+                type = types.pop()
+                raw_values = [parameter['rawValue'] for parameter in parameters]
+                dtype = cls.__vectorized_types.get(type)
+                if dtype is None:
+                    return list(map(cls.__parameter_types[type], raw_values))
+                # NumPy also accepts lists and None, which int and float reject, so those are converted one by one
+                if all(isinstance(value, (str, int, float)) for value in raw_values):
+                    return np.asarray(raw_values, dtype=dtype).tolist()
+        except (KeyError, TypeError, ValueError, OverflowError):
+            pass
+
+        # convert the values one by one, if the parameter sets use different types or to find the failing ones
+        column = []
+        for parameter in parameters:
+            try:
+                column.append(cls.__convert_to_typed_parameter(key, parameter))
+            except ParameterError as e:
+                column.append(e)
+        return column
 
     """
         Returns the given parameter (case insensitive)
     """
     def __getitem__(self, item):
-        return super(ParameterDictionary, self).__getitem__(item.lower())
+        try:
+            return super(ParameterDictionary, self).__getitem__(item)
+        except KeyError:
+            return super(ParameterDictionary, self).__getitem__(item.lower())
 
     """
        Sets the given parameter (case insensitive)
     """
     def __setitem__(self, key, value):
 
-        if isinstance(value, dict):
-            t_value = ParameterDictionary.__convert_to_typed_parameter(value)
+        if isinstance(value, dict) and "rawValue" in value and "type" in value:
+            try:
+                t_value = ParameterDictionary.__convert_to_typed_parameter(key, value)
+            except ParameterError:
+                t_value = None
         else:
             t_value = value
 
-        super(ParameterDictionary, self).__setitem__(key.lower(), t_value)
\ No newline at end of file
+        super(ParameterDictionary, self).__setitem__(key.lower(), t_value)
@@ -0,0 +1,140 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import cProfile
+import io
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+# number of functions listed in the pstats report
+REPORT_LIMIT = 50
+
+
+# profile of the enclosing profiled block of each thread, to which the profiles of child processes are added
+_local = threading.local()
+
+
+@contextmanager
+def profiled(enabled, track_memory=False):
+    """Profile the enclosed block with cProfile and, optionally, track its peak memory with tracemalloc.
+    Yields a dict that is filled with the profile when the block is left, or None if profiling is disabled."""
+    if not enabled:
+        yield None
+        return
+
+    report = {}
+    profiler = cProfile.Profile()
+    _local.current = {'track_memory': track_memory, 'children': []}
+    if track_memory:
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        children, _local.current = _local.current['children'], None
+        if track_memory:
+            report['peak_memory'] = max([tracemalloc.get_traced_memory()[1]]
+                                        + [child['peak_memory'] for child in children])
+            tracemalloc.stop()
+        stats = pstats.Stats(profiler)
+        for child in children:
+            if child['stats']:
+                stats.add(_ChildProfile(child['stats']))
+        report['pstats'] = _format_pstats(stats)
+        report['collapsed'] = _format_collapsed(stats)
+
+
+def get_options():
+    """Return whether the enclosing block is profiled and whether its memory is tracked, so child processes running
+    parts of the block can profile them with profiled_child."""
+    current = getattr(_local, 'current', None)
+    if current is None:
+        return False, False
+    return True, current['track_memory']
+
+
+@contextmanager
+def profiled_child(enabled, track_memory=False):
+    """Profile the enclosed block in a child process. Yields a dict that is filled with the raw stats and peak memory
+    to be sent to the parent and passed to add_child_profile, or None if profiling is disabled."""
+    if not enabled:
+        yield None
+        return
+
+    profile = {}
+    profiler = cProfile.Profile()
+    if track_memory:
+        # a forked child inherits the tracing of its parent, restart it to only measure the block
+        tracemalloc.stop()
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        yield profile
+    finally:
+        profiler.disable()
+        profile['peak_memory'] = tracemalloc.get_traced_memory()[1] if track_memory else 0
+        if track_memory:
+            tracemalloc.stop()
+        profiler.create_stats()
+        profile['stats'] = profiler.stats
+
+
+def add_child_profile(profile):
+    """Add the profile of a child process to the report of the enclosing profiled block."""
+    current = getattr(_local, 'current', None)
+    if profile is not None and current is not None:
+        current['children'].append(profile)
+
+
+class _ChildProfile:
+    """Raw stats of a child process in the form pstats.Stats.add expects of a profiler."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _format_pstats(stats):
+    """Return the pstats report of the most expensive functions, sorted by cumulative time."""
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LIMIT)
+    return stream.getvalue()
+
+
+def _format_collapsed(stats):
+    """Return the caller/callee pairs in the collapsed stack format of flame graph tools. cProfile only records
+    direct callers, so every stack has a depth of two. Values are the callee's own time in microseconds."""
+    lines = []
+    for callee, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, own_time, _) in callers.items():
+            value = int(own_time * 1e6)
+            if value > 0:
+                lines.append(f'{_label(caller)};{_label(callee)} {value}')
+    return '\n'.join(sorted(lines))
+
+
+def _label(func):
+    filename, line, name = func
+    return f'{name} ({filename}:{line})'
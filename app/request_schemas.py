@@ -4,17 +4,24 @@ import numpy as np
 
 
 class TranspilationRequest:
-    def __init__(self, qpu_name, impl_language, impl_url, impl_data, bearer_token, input_params):
+    def __init__(self, qpu_name, impl_language, impl_url, impl_data, bearer_token, input_params, asynchronous=False,
+                 profile=False, profile_memory=False, qpu_names=None):
         self.qpu_name = qpu_name
+        self.qpu_names = qpu_names
         self.impl_language = impl_language
         self.impl_url = impl_url
         self.impl_data = impl_data
         self.bearer_token = bearer_token
         self.input_params = input_params
+        self.asynchronous = asynchronous
+        self.profile = profile
+        self.profile_memory = profile_memory
 
 
 class ExecutionRequest:
-    def __init__(self, qpu_name, impl_language, impl_url, transpiled_cirq_json, impl_data, bearer_token, shots, input_params):
+    def __init__(self, qpu_name, impl_language, impl_url, transpiled_cirq_json, impl_data, bearer_token, shots, input_params,
+                 transpilation_id=None, profile=False, profile_memory=False, result_type='counts', seed=None,
+                 timeout=None, mitigate=False):
         self.qpu_name = qpu_name
         self.impl_language = impl_language
         self.impl_url = impl_url
@@ -23,6 +30,30 @@ class ExecutionRequest:
         self.bearer_token = bearer_token
         self.shots = shots
         self.input_params = input_params
+        self.transpilation_id = transpilation_id
+        self.profile = profile
+        self.profile_memory = profile_memory
+        self.result_type = result_type
+        self.seed = seed
+        self.timeout = timeout
+        self.mitigate = mitigate
+
+
+class CalibrationRequest:
+    def __init__(self, qpu_name, qubits=None, shots=None):
+        self.qpu_name = qpu_name
+        self.qubits = qubits
+        self.shots = shots
+
+
+class BundleRequest:
+    def __init__(self, qpu_name, circuits, bearer_token=None, seed=None, timeout=None, mitigate=False):
+        self.qpu_name = qpu_name
+        self.circuits = circuits
+        self.bearer_token = bearer_token
+        self.seed = seed
+        self.timeout = timeout
+        self.mitigate = mitigate
 
 
 class ResultRequest:
@@ -31,11 +62,15 @@ class ResultRequest:
 
 class TranspilationRequestSchema(ma.Schema):
     qpu_name = ma.fields.String(data_key="qpu-name")
+    qpu_names = ma.fields.List(ma.fields.String(), data_key="qpu-names")
     impl_language = ma.fields.String(data_key="impl-language")
     impl_url = ma.fields.String(data_key="impl-url")
     impl_data = ma.fields.String(data_key="impl-data")
     bearer_token = ma.fields.String(data_key="bearer-token")
     input_params = ma.fields.Mapping(data_key="input-params")
+    asynchronous = ma.fields.Boolean(data_key="async")
+    profile = ma.fields.Boolean()
+    profile_memory = ma.fields.Boolean(data_key="profile-memory")
 
 
 class ExecutionRequestSchema(ma.Schema):
@@ -44,9 +79,43 @@ class ExecutionRequestSchema(ma.Schema):
     impl_url = ma.fields.String(data_key="impl-url")
     impl_data = ma.fields.String(data_key="impl-data")
     transpiled_cirq_json = ma.fields.String(data_key="transpiled-cirq-json")
+    transpilation_id = ma.fields.String(data_key="transpilation-id")
     bearer_token = ma.fields.String(data_key="bearer-token")
     shots = ma.fields.Integer()
     input_params = ma.fields.Mapping(data_key="input-params")
+    profile = ma.fields.Boolean()
+    profile_memory = ma.fields.Boolean(data_key="profile-memory")
+    result_type = ma.fields.String(data_key="result-type",
+                                   validate=ma.validate.OneOf(["counts", "statevector", "unitary", "probabilities"]))
+    seed = ma.fields.Integer(validate=ma.validate.Range(min=0, max=2 ** 32 - 1))
+    timeout = ma.fields.Integer(validate=ma.validate.Range(min=1))
+    mitigate = ma.fields.Boolean()
+
+
+class CalibrationRequestSchema(ma.Schema):
+    qpu_name = ma.fields.String(data_key="qpu-name", required=True)
+    qubits = ma.fields.List(ma.fields.String())
+    shots = ma.fields.Integer(validate=ma.validate.Range(min=1))
+
+
+class BundleCircuitSchema(ma.Schema):
+    impl_language = ma.fields.String(data_key="impl-language")
+    impl_url = ma.fields.String(data_key="impl-url")
+    impl_data = ma.fields.String(data_key="impl-data")
+    transpiled_cirq_json = ma.fields.String(data_key="transpiled-cirq-json")
+    transpilation_id = ma.fields.String(data_key="transpilation-id")
+    input_params = ma.fields.Mapping(data_key="input-params")
+    shots = ma.fields.Integer(validate=ma.validate.Range(min=1))
+
+
+class BundleRequestSchema(ma.Schema):
+    qpu_name = ma.fields.String(data_key="qpu-name")
+    circuits = ma.fields.List(ma.fields.Nested(BundleCircuitSchema), required=True,
+                              validate=ma.validate.Length(min=1))
+    bearer_token = ma.fields.String(data_key="bearer-token")
+    seed = ma.fields.Integer(validate=ma.validate.Range(min=0, max=2 ** 32 - 1))
+    timeout = ma.fields.Integer(validate=ma.validate.Range(min=1))
+    mitigate = ma.fields.Boolean()
 
 
 class ResultRequestSchema(ma.Schema):
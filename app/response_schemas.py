@@ -3,7 +3,7 @@ from flask import Response
 
 
 class TranspilationResponse:
-    def __init__(self, depth, multi_qubit_gate_depth, width, total_number_of_operations, number_of_single_qubit_gates, number_of_multi_qubit_gates, number_of_measurement_operations, transpiled_cirq_json):
+    def __init__(self, depth, multi_qubit_gate_depth, width, total_number_of_operations, number_of_single_qubit_gates, number_of_multi_qubit_gates, number_of_measurement_operations, transpiled_cirq_json, routing_time=None, number_of_swaps=None, profile=None):
         self.depth = depth
         self.multi_qubit_gate_depth = multi_qubit_gate_depth
         self.width = width
@@ -12,6 +12,11 @@ class TranspilationResponse:
         self.number_of_multi_qubit_gates = number_of_multi_qubit_gates
         self.number_of_measurement_operations = number_of_measurement_operations
         self.transpiled_cirq_json = transpiled_cirq_json
+        self.routing_time = routing_time
+        self.number_of_swaps = number_of_swaps
+        # only part of the response if profiling was requested
+        if profile is not None:
+            self.profile = profile
 
     def to_json(self):
         json_response = {'depth': self.depth,
@@ -21,10 +26,45 @@ class TranspilationResponse:
                     'number-of-single-qubit-gates': self.number_of_single_qubit_gates,
                     'number-of-multi-qubit-gates': self.number_of_multi_qubit_gates,
                     'number-of-measurement-operations': self.number_of_measurement_operations,
+                    'routing-time': self.routing_time,
+                    'number-of-swaps': self.number_of_swaps,
                     'transpiled-cirq-json': self.transpiled_cirq_json}
         return json_response
 
 
+class MultiTranspilationResponse:
+    def __init__(self, transpilations, profile=None):
+        self.transpilations = transpilations
+        # only part of the response if profiling was requested
+        if profile is not None:
+            self.profile = profile
+
+    def to_json(self):
+        return {'transpilations': [{key.replace('_', '-'): value for key, value in transpilation.items()}
+                                   for transpilation in self.transpilations]}
+
+
+class TranspilationResultResponse:
+    def __init__(self, id, complete, backend=None, metrics=None, transpiled_cirq_json=None):
+        self.id = id
+        self.complete = complete
+        self.backend = backend
+        self.metrics = metrics or {}
+        self.transpiled_cirq_json = transpiled_cirq_json
+        # metrics either hold the properties of the transpiled circuit or an error message
+        for key, value in self.metrics.items():
+            setattr(self, key, value)
+
+    def to_json(self):
+        if self.complete:
+            json_response = {'id': self.id, 'complete': self.complete, 'backend': self.backend,
+                             'transpiled-cirq-json': self.transpiled_cirq_json}
+            json_response.update({key.replace('_', '-'): value for key, value in self.metrics.items()})
+            return json_response
+        else:
+            return {'id': self.id, 'complete': self.complete}
+
+
 class ExecutionResponse(Response):
     def __init__(self, location):
         super().__init__()
@@ -35,18 +75,36 @@ class ExecutionResponse(Response):
         return json_response
 
 
+class BundleResponse:
+    def __init__(self, locations):
+        self.locations = locations
+
+    def to_json(self):
+        json_response = {'Locations': self.locations}
+        return json_response
+
+
 class ResultResponse:
-    def __init__(self, id, complete, result = None, backend = None, shots = None):
+    def __init__(self, id, complete, result = None, backend = None, shots = None, timings = None,
+                 result_type = 'counts', progress = None):
         self.id = id
         self.complete = complete
         self.result = result
         self.backend = backend
         self.shots = shots
+        self.timings = timings
+        self.result_type = result_type
+        # status, stage, and fraction of the stage that is done, only part of the response of incomplete results
+        if progress is not None:
+            self.progress = progress
 
     def to_json(self):
         if self.result and self.backend and self.shots:
             return {'id': self.id, 'complete': self.complete, 'result': self.result,
-                            'backend': self.backend, 'shots': self.shots}
+                            'backend': self.backend, 'shots': self.shots, 'timings': self.timings,
+                            'result-type': self.result_type}
+        elif hasattr(self, 'progress'):
+            return {'id': self.id, 'complete': self.complete, 'progress': self.progress}
         else:
             return {'id': self.id, 'complete': self.complete}
 
@@ -59,16 +117,66 @@ class TranspilationResponseSchema(ma.Schema):
     number_of_single_qubit_gates = ma.fields.Integer(data_key="number-of-single-qubit-gates")
     number_of_multi_qubit_gates = ma.fields.Integer(data_key="number-of-multi-qubit-gates")
     number_of_measurement_operations = ma.fields.Integer(data_key="number-of-measurement-operations")
+    routing_time = ma.fields.Float(data_key="routing-time")
+    number_of_swaps = ma.fields.Integer(data_key="number-of-swaps")
     transpiled_cirq_json = ma.fields.String(data_key="transpiled-cirq-json")
+    profile = ma.fields.Nested("ProfileResponseSchema")
+    # only part of the response if the circuit was transpiled for several qpus
+    transpilations = ma.fields.List(ma.fields.Nested("TargetTranspilationResponseSchema"))
+
+
+class TargetTranspilationResponseSchema(TranspilationResponseSchema):
+    class Meta:
+        exclude = ("profile", "transpilations")
+
+    qpu_name = ma.fields.String(data_key="qpu-name")
+    error = ma.fields.String()
+
+
+class TranspilationResultResponseSchema(TranspilationResponseSchema):
+    id = ma.fields.UUID()
+    complete = ma.fields.Boolean()
+    backend = ma.fields.String()
+    error = ma.fields.String()
 
 
 class ExecutionResponseSchema(ma.Schema):
     location = ma.fields.String()
 
 
+class BundleResponseSchema(ma.Schema):
+    locations = ma.fields.List(ma.fields.String())
+
+
+class ProfileResponseSchema(ma.Schema):
+    pstats = ma.fields.String()
+    collapsed = ma.fields.String()
+    peak_memory = ma.fields.Integer(data_key="peak-memory")
+
+
+class QueueBacklogResponseSchema(ma.Schema):
+    length = ma.fields.Integer()
+    oldest_job_age = ma.fields.Float(data_key="oldest-job-age")
+    pending_work = ma.fields.Float(data_key="pending-work")
+    workers = ma.fields.Integer()
+    busy_workers = ma.fields.Integer(data_key="busy-workers")
+    utilization = ma.fields.Float()
+
+
+class BacklogResponseSchema(QueueBacklogResponseSchema):
+    queues = ma.fields.List(ma.fields.Nested("NamedQueueBacklogResponseSchema"))
+
+
+class NamedQueueBacklogResponseSchema(QueueBacklogResponseSchema):
+    name = ma.fields.String()
+
+
 class ResultResponseSchema(ma.Schema):
     id = ma.fields.UUID()
     complete = ma.fields.Boolean()
     result = ma.fields.Mapping()
     backend = ma.fields.String()
-    shots = ma.fields.Integer()
\ No newline at end of file
+    shots = ma.fields.Integer()
+    timings = ma.fields.Mapping()
+    result_type = ma.fields.String(data_key="result-type")
+    progress = ma.fields.Mapping()
\ No newline at end of file
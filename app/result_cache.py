@@ -0,0 +1,74 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import json
+import time
+
+from app import app, monitoring
+
+# Redis keys of the cached histograms and of the sorted set holding their last access time
+ENTRY_KEY_PREFIX = 'cirq-service_result_cache:'
+INDEX_KEY = 'cirq-service_result_cache_index'
+
+
+def get_key(implementation, input_params, backend_name, shots, seed, noise_model=None, mitigate=False):
+    """Return the cache key of a seeded execution. The implementation is identified by its code, i.e., the downloaded
+    or uploaded implementation or the transpiled Cirq-JSON, so the key changes with the code behind a URL but is known
+    before the implementation is prepared and transpiled."""
+    key = json.dumps([implementation, input_params or {}, backend_name.lower(), shots, seed, repr(noise_model),
+                      mitigate], sort_keys=True, default=_to_json)
+    return ENTRY_KEY_PREFIX + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _to_json(value):
+    # typed input parameters, e.g., NumPy arrays or complex numbers
+    return value.tolist() if hasattr(value, 'tolist') else repr(value)
+
+
+def get(key):
+    """Return the cached histogram for the key, or None, and mark the entry as recently used."""
+    if not key or app.config['RESULT_CACHE_SIZE'] <= 0:
+        return None
+    pipeline = app.redis.pipeline()
+    pipeline.get(key)
+    # only refresh the access time of entries that are still in the cache
+    pipeline.zadd(INDEX_KEY, {key: time.time()}, xx=True)
+    entry, _ = pipeline.execute()
+    monitoring.observe_cache_lookup('result', entry is not None)
+    return json.loads(entry) if entry is not None else None
+
+
+def put(key, histogram):
+    """Cache the histogram and evict the least recently used entries if the cache exceeds RESULT_CACHE_SIZE."""
+    size = app.config['RESULT_CACHE_SIZE']
+    if not key or size <= 0:
+        return
+    pipeline = app.redis.pipeline()
+    pipeline.set(key, json.dumps(histogram))
+    pipeline.zadd(INDEX_KEY, {key: time.time()})
+    pipeline.zcard(INDEX_KEY)
+    number_of_entries = pipeline.execute()[-1]
+    if number_of_entries > size:
+        evicted = app.redis.zrange(INDEX_KEY, 0, number_of_entries - size - 1)
+        if evicted:
+            pipeline = app.redis.pipeline()
+            pipeline.delete(*evicted)
+            pipeline.zrem(INDEX_KEY, *evicted)
+            pipeline.execute()
@@ -0,0 +1,69 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import os
+import uuid
+
+import numpy as np
+
+from app import app
+
+# result types that are returned as an array in a .npy file instead of a histogram
+ARRAY_RESULT_TYPES = ('statevector', 'unitary', 'probabilities')
+
+# number of array elements that are copied into the memory-mapped file at once
+CHUNK_SIZE = 1 << 20
+
+
+def get_path(result_id):
+    """Return the path of the .npy file holding the array of the given result."""
+    return os.path.join(app.config['RESULT_DATA_DIR'], os.path.basename(str(result_id)) + '.npy')
+
+
+def write(result_id, array, square=False):
+    """Write the array chunk by chunk to a memory-mapped .npy file in the data directory. If square is set, the
+    absolute squares of the values are written, e.g., the probabilities of a state vector. Return the metadata of the
+    written array."""
+    os.makedirs(app.config['RESULT_DATA_DIR'], exist_ok=True)
+    path = get_path(result_id)
+    # write to a temporary file first, so the data endpoint never serves a partially written array
+    temporary_path = path + '.' + uuid.uuid4().hex + '.tmp'
+    dtype = np.abs(array[:1]).dtype if square else array.dtype
+    try:
+        target = np.lib.format.open_memmap(temporary_path, mode='w+', dtype=dtype, shape=array.shape)
+        source, flat_target = array.reshape(-1), target.reshape(-1)
+        for start in range(0, source.size, CHUNK_SIZE):
+            chunk = source[start:start + CHUNK_SIZE]
+            if square:
+                np.square(np.abs(chunk), out=flat_target[start:start + CHUNK_SIZE])
+            else:
+                flat_target[start:start + CHUNK_SIZE] = chunk
+        target.flush()
+        del target
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return {'shape': list(array.shape), 'dtype': str(dtype), 'size': os.path.getsize(path)}
+
+
+def read(result_id):
+    """Open the array of the given result as a read-only memory map."""
+    return np.load(get_path(result_id), mmap_mode='r')
@@ -26,6 +26,14 @@ class Result(db.Model):
     backend = db.Column(db.String(1200), default="")
     shots = db.Column(db.Integer, default=0)
     complete = db.Column(db.Boolean, default=False)
+    # counts, or statevector, unitary, or probabilities if the result holds the metadata of an array in a .npy file
+    result_type = db.Column(db.String(20), default="counts")
+    # durations of the pipeline stages of the job in seconds, as JSON
+    timings = db.Column(db.Text, default="")
+    # cProfile report of the job, as JSON, if profiling was requested
+    profile = db.Column(db.Text, default="")
+    # id of the RQ job computing the result if it differs from the id of the result, e.g., for circuits of a bundle
+    job_id = db.Column(db.String(36), nullable=True)
 
     def __repr__(self):
         return 'Result {}'.format(self.result)
@@ -0,0 +1,123 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import json
+
+from sqlalchemy import bindparam, false
+
+from app import app, db
+from app.result_model import Result
+from app.transpilation_model import Transpilation
+
+# Redis list holding completed results that are not yet written to the database
+BUFFER_KEY = 'cirq-service_result_buffer'
+
+
+def create_pending(result_ids, backend, shots, result_type='counts', job_id=None):
+    """Insert incomplete result rows for the given job ids with a single INSERT and commit. Shots is either the
+    number of shots of all results or a list with the shots of every result. If given, job_id is the id of the one
+    job computing all results."""
+    if not isinstance(shots, (list, tuple)):
+        shots = [shots] * len(result_ids)
+    db.session.bulk_insert_mappings(Result, [{'id': result_id, 'backend': backend, 'shots': result_shots,
+                                              'result': "", 'complete': False, 'result_type': result_type,
+                                              'job_id': job_id}
+                                             for result_id, result_shots in zip(result_ids, shots)])
+    db.session.commit()
+
+
+def finalize(result_id, result, timings=None, profile=None):
+    """Complete the result row of a job with a single UPDATE, unless it is already complete, e.g., because the job was
+    cancelled. If RESULT_BUFFER_SIZE is larger than one, the completion is buffered in Redis and written together with
+    the completions of other jobs."""
+    row = {'id': result_id, 'result': json.dumps(result), 'complete': True,
+           'timings': json.dumps(timings) if timings is not None else "",
+           'profile': json.dumps(profile) if profile is not None else ""}
+    if app.config['RESULT_BUFFER_SIZE'] > 1:
+        if app.redis.rpush(BUFFER_KEY, json.dumps(row)) >= app.config['RESULT_BUFFER_SIZE']:
+            flush()
+    else:
+        _complete([row])
+
+
+def finalize_all(results, timings=None):
+    """Complete the result rows of all circuits of a bundle in one transaction. Results and timings map the result
+    ids to the result and the stage timings of every circuit. Rows that are already complete, e.g., because the
+    bundle was cancelled, are left unchanged. Return the number of completed rows."""
+    timings = timings or {}
+    return _complete([{'id': result_id, 'result': json.dumps(result), 'complete': True,
+                       'timings': json.dumps(timings[result_id]) if result_id in timings else "", 'profile': ""}
+                      for result_id, result in results.items()])
+
+
+def flush():
+    """Write all buffered completions to the database in one transaction. Return the number of written rows."""
+    pipeline = app.redis.pipeline()
+    pipeline.lrange(BUFFER_KEY, 0, -1)
+    pipeline.delete(BUFFER_KEY)
+    entries, _ = pipeline.execute()
+    if not entries:
+        return 0
+    rows = [json.loads(entry) for entry in entries]
+    try:
+        _complete(rows)
+    except Exception:
+        # put the completions back, so they are written by the next flush
+        app.redis.rpush(BUFFER_KEY, *entries)
+        raise
+    return len(rows)
+
+
+def finalize_transpilation(transpilation_id, metrics, transpiled_cirq_json=None, profile=None):
+    """Complete the row of an asynchronous transpilation with a single UPDATE."""
+    _update(Transpilation, [{'id': transpilation_id, 'metrics': json.dumps(metrics), 'complete': True,
+                             'transpiled_cirq_json': transpiled_cirq_json or "",
+                             'profile': json.dumps(profile) if profile is not None else ""}])
+
+
+def _complete(rows):
+    """Complete the given result rows with a single conditional UPDATE statement and commit once. Rows that are
+    already complete are left unchanged, so a cancellation and a concurrent completion never overwrite each other.
+    Return the number of completed rows."""
+    if not rows:
+        return 0
+    table = Result.__table__
+    statement = table.update() \
+        .where(table.c.id == bindparam('row_id')).where(table.c.complete == false()) \
+        .values(result=bindparam('row_result'), complete=True, timings=bindparam('row_timings'),
+                profile=bindparam('row_profile'))
+    try:
+        completed = db.session.execute(statement, [{'row_id': row['id'], 'row_result': row['result'],
+                                                    'row_timings': row['timings'], 'row_profile': row['profile']}
+                                                   for row in rows]).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return completed
+
+
+def _update(model, rows):
+    """Update the given rows by primary key without loading them first and commit once."""
+    try:
+        db.session.bulk_update_mappings(model, rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
@@ -16,21 +16,28 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 # ******************************************************************************
-import cirq
 from flask_smorest import Blueprint
 
-from app import app, cirq_handler, implementation_handler, db, parameters
+from app import app, db, parameters, monitoring, profiling, result_store, \
+    result_data, backlog
 from app.result_model import Result
-from flask import jsonify, abort, request
+from app.transpilation_model import Transpilation
+from flask import jsonify, abort, request, Response, send_file
+from rq.command import send_stop_job_command
+from rq.exceptions import InvalidJobOperation, NoSuchJobError
+from rq.job import Job, JobStatus
 import logging
 import json
 import base64
-from cirq import Circuit
 import traceback
+import uuid
 from app.request_schemas import TranspilationRequestSchema, TranspilationRequest, ExecutionRequestSchema, \
-    ExecutionRequest, ResultRequestSchema, ResultRequest
+    ExecutionRequest, ResultRequestSchema, ResultRequest, CalibrationRequestSchema, CalibrationRequest, \
+    BundleRequestSchema, BundleRequest
 from app.response_schemas import TranspilationResponseSchema, TranspilationResponse, ExecutionResponseSchema, \
-    ExecutionResponse, ResultResponseSchema, ResultResponse
+    ExecutionResponse, ResultResponseSchema, ResultResponse, TranspilationResultResponseSchema, \
+    TranspilationResultResponse, ProfileResponseSchema, MultiTranspilationResponse, BacklogResponseSchema, \
+    BundleResponseSchema, BundleResponse
 
 blp = Blueprint(
     "routes",
@@ -53,20 +60,30 @@ blp = Blueprint(
 def transpile_circuit(json: TranspilationRequest):
     """Get implementation from URL. Pass input into implementation. Generate and transpile circuit
     and return depth and width."""
+    # Cirq is only loaded by the API processes that transpile synchronously, all other endpoints start without it
+    import cirq
+    from app import cirq_handler, implementation_handler
+
     if not json:
         abort(400)
 
     app.logger.info("The input is:" + str(json))
 
     qpu_name = json.get('qpu_name')
+    qpu_names = json.get('qpu_names')
     impl_language = json.get('impl_language', '')
     input_params = json.get('input_params', "")
     impl_url = json.get('impl_url', "")
     impl_data = json.get('impl_data', "")
     bearer_token = json.get("bearer_token", "")
+    profile = json.get('profile', False)
+    profile_memory = json.get('profile_memory', False)
     app.logger.info("The input params are:" + str(input_params))
     if input_params != "":
         input_params = parameters.ParameterDictionary(input_params)
+        if input_params.errors:
+            app.logger.info("Invalid input params: " + str([e.to_json() for e in input_params.errors]))
+            abort(400)
     # adapt if real backends are available
     token = ''
     # if 'token' in input_params:
@@ -76,83 +93,110 @@ def transpile_circuit(json: TranspilationRequest):
     # else:
     #     abort(400)
 
-    if impl_url is not None and impl_url != "":
-        impl_url = json.get('impl_url')
-        if impl_language.lower() == 'cirq-json':
-            short_impl_name = 'no name'
-            circuit = implementation_handler.prepare_code_from_cirq_url(impl_url, bearer_token)
-        else:
-            short_impl_name = "untitled"
-            try:
-                circuit = implementation_handler.prepare_code_from_url(impl_url, input_params, bearer_token)
-            except ValueError:
-                abort(400)
+    if json.get('asynchronous', False):
+        if (not impl_url and not impl_data) or qpu_names:
+            abort(400)
+        transpilation = Transpilation(id=str(uuid.uuid4()), backend=qpu_name)
+        db.session.add(transpilation)
+        db.session.commit()
+        app.transpile_queue.enqueue('app.tasks.transpile', impl_url=impl_url, impl_data=impl_data,
+                                    impl_language=impl_language, qpu_name=qpu_name,
+                                    input_params=input_params, bearer_token=bearer_token,
+                                    profile=profile, profile_memory=profile_memory, job_id=transpilation.id)
+        backlog.add_pending(app.transpile_queue, transpilation.id, backlog.estimate_cost())
+
+        content_location = '/cirq-service/api/v1.0/transpilations/' + transpilation.id
+        response = ExecutionResponse(content_location)
+        response.status_code = 202
+        response.headers.set("Location", content_location)
+        return response
 
-    elif impl_data:
-        impl_data = base64.b64decode(impl_data.encode()).decode()
+    with profiling.profiled(profile, profile_memory) as profile_report:
+        if impl_url is not None and impl_url != "":
+            impl_url = json.get('impl_url')
+            if impl_language.lower() == 'cirq-json':
+                short_impl_name = 'no name'
+                circuit = implementation_handler.prepare_code_from_cirq_url(impl_url, bearer_token)
+            else:
+                short_impl_name = "untitled"
+                try:
+                    circuit = implementation_handler.prepare_code_from_url(impl_url, input_params, bearer_token)
+                except ValueError:
+                    abort(400)
 
-        short_impl_name = 'no short name'
-        if impl_language.lower() == 'cirq-json':
-            circuit = implementation_handler.prepare_code_from_cirq_json(impl_data)
+        elif impl_data:
+            impl_data = base64.b64decode(impl_data.encode()).decode()
+
+            short_impl_name = 'no short name'
+            if impl_language.lower() == 'cirq-json':
+                circuit = implementation_handler.prepare_code_from_cirq_json(impl_data)
+            else:
+                try:
+                    circuit = implementation_handler.prepare_code_from_data(impl_data, input_params)
+                except ValueError:
+                    abort(400)
+        else:
+            abort(400)
+
+        if qpu_names:
+            # prepare the circuit once and transpile it for all qpus concurrently
+            with monitoring.StageTimer().stage('transpile'):
+                transpilations = cirq_handler.transpile_for_qpus(qpu_names, circuit)
         else:
             try:
-                circuit = implementation_handler.prepare_code_from_data(impl_data, input_params)
-            except ValueError:
+                with monitoring.StageTimer().stage('transpile'):
+                    transpiled_circuit, routing_metrics = cirq_handler.transpile_for_qpu(qpu_name, circuit)
+                metrics = dict(cirq_handler.get_circuit_metrics(transpiled_circuit), **routing_metrics)
+            except NotImplementedError:
+                app.logger.info(f"QPU {qpu_name} is not supported!")
                 abort(400)
-    else:
-        abort(400)
+            except Exception:
+                app.logger.info(f"Transpile {short_impl_name} for {qpu_name}.")
+                app.logger.info(traceback.format_exc())
+                return jsonify({'error': 'transpilation failed'}), 200
 
-    try:
-        transpiled_circuit: Circuit = cirq_handler.transpile_for_qpu(qpu_name, circuit)
-
-        # count number of gates, multi qubit gates and measurements operation, by iterating over all operations
-        number_of_multi_qubit_gates = 0
-        number_of_measurement_operations = 0
-        total_number_of_gates = 0
-        for operation in transpiled_circuit.all_operations():
-            if type(operation) is cirq.GateOperation:
-                total_number_of_gates += 1
-                if cirq.is_measurement(operation):
-                    number_of_measurement_operations += 1
-                elif len(operation.qubits) > 1:
-                    number_of_multi_qubit_gates += 1
-
-        # width: the amount of qubits
-        width = len(transpiled_circuit.all_qubits())
-
-        # gate_depth: the longest subsequence of compiled instructions where adjacent instructions share resources
-        # Cirq packs gates as tight as possible in new circuits, the number of moments then is equal to the depth
-        depth = len(cirq.Circuit(transpiled_circuit.all_operations()))
-
-        # multi_qubit_gate_depth: Maximum number of successive two-qubit gates in the native cirq program;
-        multi_qubit_gate_depth = len(cirq.Circuit([i for i in transpiled_circuit.all_operations()
-                                                   if len(i.qubits) > 1]))
-
-        # count number of single qubit gates
-        number_of_single_qubit_gates = total_number_of_gates - number_of_multi_qubit_gates
-
-        # count total number of all operations including gates and measurement operations
-        total_number_of_operations = total_number_of_gates + number_of_measurement_operations
-    except NotImplementedError:
-        app.logger.info(f"QPU {qpu_name} is not supported!")
-        abort(400)
-    except Exception:
-        app.logger.info(f"Transpile {short_impl_name} for {qpu_name}.")
-        app.logger.info(traceback.format_exc())
-        return jsonify({'error': 'transpilation failed'}), 200
+    if qpu_names:
+        app.logger.info(f"Transpile {short_impl_name} for {', '.join(qpu_names)}")
+        return MultiTranspilationResponse(transpilations, profile_report)
 
     app.logger.info(f"Transpile {short_impl_name} for {qpu_name}: "
-                    f"w={width}, "
-                    f"d={depth}, "
-                    f"total number of operations={total_number_of_operations}, "
-                    f"number of single qubit gates={number_of_single_qubit_gates}, "
-                    f"number of multi qubit gates={number_of_multi_qubit_gates}, "
-                    f"number of measurement operations={number_of_measurement_operations}, "
-                    f"multi qubit gate depth={multi_qubit_gate_depth}")
+                    f"w={metrics['width']}, "
+                    f"d={metrics['depth']}, "
+                    f"total number of operations={metrics['total_number_of_operations']}, "
+                    f"number of single qubit gates={metrics['number_of_single_qubit_gates']}, "
+                    f"number of multi qubit gates={metrics['number_of_multi_qubit_gates']}, "
+                    f"number of measurement operations={metrics['number_of_measurement_operations']}, "
+                    f"multi qubit gate depth={metrics['multi_qubit_gate_depth']}, "
+                    f"number of swaps={metrics['number_of_swaps']}, "
+                    f"routing time={metrics['routing_time']:.3f}s")
+
+    return TranspilationResponse(transpiled_cirq_json=cirq.to_json(transpiled_circuit, indent=4),
+                                 profile=profile_report, **metrics)
 
-    return TranspilationResponse(depth, multi_qubit_gate_depth, width, total_number_of_operations,
-                                 number_of_single_qubit_gates, number_of_multi_qubit_gates,
-                                 number_of_measurement_operations, cirq.to_json(transpiled_circuit, indent=4))
+
+@blp.route("/transpilations/<string:transpilation_id>", methods=["GET"])
+@blp.response(200, TranspilationResultResponseSchema)
+def get_transpilation(transpilation_id):
+    """Return the result of an asynchronous transpilation when it is available."""
+    transpilation = Transpilation.query.get(str(transpilation_id).strip())
+    if not transpilation:
+        abort(404)
+    if transpilation.complete:
+        response = TranspilationResultResponse(transpilation.id, transpilation.complete, transpilation.backend,
+                                               json.loads(transpilation.metrics), transpilation.transpiled_cirq_json)
+    else:
+        response = TranspilationResultResponse(transpilation.id, transpilation.complete)
+    return response
+
+
+@blp.route("/transpilations/<string:transpilation_id>/profile", methods=["GET"])
+@blp.response(200, ProfileResponseSchema)
+def get_transpilation_profile(transpilation_id):
+    """Return the profile of an asynchronous transpilation that was run with profiling enabled."""
+    transpilation = Transpilation.query.get(str(transpilation_id).strip())
+    if not transpilation or not transpilation.profile:
+        abort(404)
+    return json.loads(transpilation.profile)
 
 
 @blp.route("/execute", methods=["POST"])
@@ -175,9 +219,20 @@ def execute_circuit(json: ExecutionRequest):
     bearer_token = json.get("bearer_token", "")
     impl_data = json.get('impl_data')
     transpiled_cirq_json = json.get('transpiled_cirq_json', "")
+    transpilation_id = json.get('transpilation_id', "")
+    profile = json.get('profile', False)
+    profile_memory = json.get('profile_memory', False)
+    result_type = json.get('result_type', 'counts')
+    seed = json.get('seed')
+    mitigate = json.get('mitigate', False)
+    # the server policy caps the time a job may run
+    job_timeout = min(json.get('timeout') or app.config['MAX_JOB_TIMEOUT'], app.config['MAX_JOB_TIMEOUT'])
     input_params = json.get('input_params', "")
     if input_params != "":
         input_params = parameters.ParameterDictionary(input_params)
+        if input_params.errors:
+            app.logger.info("Invalid input params: " + str([e.to_json() for e in input_params.errors]))
+            abort(400)
     shots = request.json.get('shots', 1024)
     if 'token' in input_params:
         token = input_params['token']
@@ -186,26 +241,140 @@ def execute_circuit(json: ExecutionRequest):
     else:
         token = ""
 
-    job = app.execute_queue.enqueue('app.tasks.execute', impl_url=impl_url, impl_data=impl_data,
-                                    impl_language=impl_language, transpiled_cirq_json=transpiled_cirq_json,
-                                    qpu_name=qpu_name,
-                                    token=token, input_params=input_params, shots=shots, bearer_token=bearer_token)
-    result = Result(id=job.get_id(), backend=qpu_name, shots=shots)
-    db.session.add(result)
-    db.session.commit()
+    if transpilation_id:
+        # reference a previously stored transpilation instead of uploading the transpiled circuit again
+        transpilation = Transpilation.query.get(str(transpilation_id).strip())
+        if not transpilation or not transpilation.complete or not transpilation.transpiled_cirq_json:
+            abort(400)
+        qpu_name = qpu_name or transpilation.backend
+        cost = backlog.estimate_transpilation_cost(transpilation, shots)
+    else:
+        cost = backlog.estimate_cost(shots)
+
+    # the pending row has to exist before a worker picks up the job and completes it
+    job_id = str(uuid.uuid4())
+    result_store.create_pending([job_id], qpu_name, shots, result_type)
+    app.execute_queue.enqueue('app.tasks.execute', impl_url=impl_url, impl_data=impl_data,
+                              impl_language=impl_language, transpiled_cirq_json=transpiled_cirq_json,
+                              transpilation_id=transpilation_id, qpu_name=qpu_name,
+                              token=token, input_params=input_params, shots=shots, bearer_token=bearer_token,
+                              profile=profile, profile_memory=profile_memory, result_type=result_type,
+                              seed=seed, mitigate=mitigate, job_id=job_id, job_timeout=job_timeout)
+    backlog.add_pending(app.execute_queue, job_id, cost)
 
     logging.info('Returning HTTP response to client...')
-    content_location = '/cirq-service/api/v1.0/results/' + result.id
+    content_location = '/cirq-service/api/v1.0/results/' + job_id
     response = ExecutionResponse(content_location)
     response.status_code = 202
     response.headers.set("Location", content_location)
     return response
 
 
-@app.route('/cirq-service/api/v1.0/calculate-calibration-matrix', methods=['POST'])
-def calculate_calibration_matrix():
+@blp.route("/execute-bundle", methods=["POST"])
+@blp.arguments(
+    BundleRequestSchema,
+    example={
+        "qpu-name": "local-simulator",
+        "circuits": [
+            {"impl-url": "https://raw.githubusercontent.com/UST-QuAntiL/cirq-service/main/Sample%20Implementations/ciruit_json.json",
+             "impl-language": "Cirq-JSON",
+             "shots": 1024},
+            {"transpilation-id": "ID-OF-THE-TRANSPILATION",
+             "shots": 100}
+        ]
+    }
+)
+@blp.response(202, BundleResponseSchema)
+def execute_bundle(json: BundleRequest):
+    """Put a single job executing all circuits of the bundle in queue. Return the locations of the later results
+    of the circuits."""
+    qpu_name = json.get('qpu_name')
+    circuits = json.get('circuits')
+    if len(circuits) > app.config['MAX_BUNDLE_SIZE']:
+        abort(400)
+    job_timeout = min(json.get('timeout') or app.config['MAX_JOB_TIMEOUT'], app.config['MAX_JOB_TIMEOUT'])
+
+    # the parameter sets of all circuits are converted at once, circuits with the same parameters share a schema
+    input_params, errors = parameters.ParameterDictionary.convert_batch(
+        [circuit.get('input_params', {}) for circuit in circuits])
+    if errors:
+        app.logger.info("Invalid input params: " + str(errors))
+        abort(400)
+
+    cost = 0.0
+    for circuit, circuit_input_params in zip(circuits, input_params):
+        circuit.setdefault('shots', 1024)
+        circuit['input_params'] = circuit_input_params
+        if circuit.get('transpilation_id'):
+            transpilation = Transpilation.query.get(str(circuit['transpilation_id']).strip())
+            if not transpilation or not transpilation.complete or not transpilation.transpiled_cirq_json:
+                abort(400)
+            qpu_name = qpu_name or transpilation.backend
+            cost += backlog.estimate_transpilation_cost(transpilation, circuit['shots'])
+        else:
+            cost += backlog.estimate_cost(circuit['shots'])
+    if not qpu_name:
+        abort(400)
+
+    # the job has the id of the first result, all results store it to report the progress and to cancel the bundle
+    result_ids = [str(uuid.uuid4()) for _ in circuits]
+    result_store.create_pending(result_ids, qpu_name, [circuit['shots'] for circuit in circuits],
+                                job_id=result_ids[0])
+    app.execute_queue.enqueue('app.tasks.execute_bundle', result_ids=result_ids, circuits=circuits,
+                              qpu_name=qpu_name, bearer_token=json.get('bearer_token', ""), seed=json.get('seed'),
+                              mitigate=json.get('mitigate', False), job_id=result_ids[0], job_timeout=job_timeout)
+    backlog.add_pending(app.execute_queue, result_ids[0], cost)
+
+    content_locations = ['/cirq-service/api/v1.0/results/' + result_id for result_id in result_ids]
+    return BundleResponse(content_locations), 202, {'Location': content_locations[0]}
+
+
+@blp.route("/calculate-calibration-matrix", methods=["POST"])
+@blp.arguments(
+    CalibrationRequestSchema,
+    example={
+        "qpu-name": "local-simulator",
+        "qubits": ["q(0)", "q(1)", "q(2)"],
+        "shots": 8192
+    }
+)
+@blp.response(202, ExecutionResponseSchema)
+def calculate_calibration_matrix(json: CalibrationRequest):
     """Put calibration matrix calculation job in queue. Return location of the later result."""
-    abort(404)
+    qpu_name = json.get('qpu_name')
+    qubits = json.get('qubits')
+    shots = json.get('shots', app.config['CALIBRATION_SHOTS'])
+    if qpu_name.lower() == 'local-simulator' and not qubits:
+        # the local simulator has no fixed set of qubits to calibrate
+        abort(400)
+
+    job_id = str(uuid.uuid4())
+    result_store.create_pending([job_id], qpu_name, shots, 'calibration')
+    app.execute_queue.enqueue('app.tasks.calculate_calibration_matrix', qpu_name=qpu_name, qubits=qubits, shots=shots,
+                              job_id=job_id)
+    backlog.add_pending(app.execute_queue, job_id, backlog.estimate_cost())
+
+    content_location = '/cirq-service/api/v1.0/results/' + job_id
+    response = ExecutionResponse(content_location)
+    response.status_code = 202
+    response.headers.set("Location", content_location)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose the Prometheus metrics of the API and worker processes."""
+    monitoring.observe_backlog(backlog.get_backlog([app.execute_queue, app.transpile_queue]))
+    data, content_type = monitoring.generate_metrics()
+    return Response(data, content_type=content_type)
+
+
+@blp.route("/backlog", methods=["GET"])
+@blp.response(200, BacklogResponseSchema)
+def get_backlog():
+    """Return the length, the age of the oldest job, the estimated pending work, and the worker utilization of the
+    queues, e.g., to scale the number of workers."""
+    return backlog.get_backlog([app.execute_queue, app.transpile_queue])
 
 
 @blp.route("/results/<string:result_id>", methods=["GET"])
@@ -213,14 +382,93 @@ def calculate_calibration_matrix():
 def get_result(result_id):
     """Return result when it is available."""
     result = Result.query.get(str(result_id).strip())
+    if not result:
+        abort(404)
+    if not result.complete and app.config['RESULT_BUFFER_SIZE'] > 1 and result_store.flush():
+        # the completion may still be waiting in the buffer
+        db.session.refresh(result)
     if result.complete:
         result_histogram = json.loads(result.result)
-        response = ResultResponse(result.id, result.complete, result_histogram, result.backend, result.shots)
+        timings = json.loads(result.timings) if result.timings else None
+        response = ResultResponse(result.id, result.complete, result_histogram, result.backend, result.shots,
+                                  timings, result.result_type or 'counts')
     else:
-        response = ResultResponse(result.id, result.complete)
+        response = ResultResponse(result.id, result.complete, progress=_get_progress(result.job_id or result.id))
     return response
 
 
+@blp.route("/results/<string:result_id>", methods=["DELETE"])
+@blp.response(200, ResultResponseSchema)
+def cancel_result(result_id):
+    """Cancel the job of a result that is queued or running. The result is completed with an error."""
+    result = Result.query.get(str(result_id).strip())
+    if not result:
+        abort(404)
+    if not result.complete and app.config['RESULT_BUFFER_SIZE'] > 1 and result_store.flush():
+        db.session.refresh(result)
+    if result.complete:
+        abort(409)
+
+    job_id = result.job_id or result.id
+    try:
+        job = Job.fetch(job_id, connection=app.redis)
+        if job.get_status() == JobStatus.STARTED:
+            # kills the work horse executing the job, so the worker is free for the next job immediately
+            send_stop_job_command(app.redis, job.id)
+        else:
+            job.cancel()
+    except (NoSuchJobError, InvalidJobOperation):
+        # the job already finished or expired
+        pass
+    backlog.remove_pending(app.execute_queue.name, job_id)
+
+    cancelled = {'error': 'job cancelled'}
+    if result.job_id:
+        # cancelling a circuit of a bundle cancels all circuits of the bundle that are not complete yet
+        result_ids = [result_id for result_id, in Result.query.with_entities(Result.id)
+                      .filter_by(job_id=result.job_id, complete=False)]
+    else:
+        result_ids = [result.id]
+    # not buffered, and only if the job did not complete in the meantime
+    if not result_store.finalize_all({result_id: cancelled for result_id in result_ids}):
+        abort(409)
+    return ResultResponse(result.id, True, cancelled, result.backend, result.shots, None, result.result_type)
+
+
+def _get_progress(job_id):
+    """Return the status of the RQ job of a result together with the stage and the fraction of it that is done."""
+    try:
+        job = Job.fetch(job_id, connection=app.redis)
+    except NoSuchJobError:
+        return None
+    return dict(job.meta.get('progress', {}), status=job.get_status())
+
+
+@blp.route("/results/<string:result_id>/data", methods=["GET"])
+@blp.response(200)
+def get_result_data(result_id):
+    """Return the state vector, unitary, or probabilities of a result as .npy file. Supports HTTP range requests."""
+    result = Result.query.get(str(result_id).strip())
+    if not result or not result.complete or result.result_type not in result_data.ARRAY_RESULT_TYPES:
+        abort(404)
+    try:
+        return send_file(result_data.get_path(result.id), mimetype='application/octet-stream', conditional=True,
+                         as_attachment=True, attachment_filename=result.id + '.npy')
+    except FileNotFoundError:
+        # the execution failed before the array was written
+        abort(404)
+
+
+@blp.route("/results/<string:result_id>/profile", methods=["GET"])
+@blp.response(200, ProfileResponseSchema)
+def get_result_profile(result_id):
+    """Return the profile of an execution that was run with profiling enabled."""
+    result = Result.query.get(str(result_id).strip())
+    if not result or not result.profile:
+        abort(404)
+    return json.loads(result.profile)
+
+
 @blp.route("/version", methods=["GET"])
 @blp.response(200)
 def version():
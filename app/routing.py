@@ -0,0 +1,228 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+from collections import defaultdict
+
+import cirq
+import networkx as nx
+import numpy as np
+
+from app import monitoring
+
+# number of upcoming two-qubit gates considered by the router besides the front layer, and their weight
+EXTENDED_SET_SIZE = 20
+EXTENDED_SET_WEIGHT = 0.5
+# penalty added to recently swapped qubits, so the router does not swap the same qubits back and forth
+DECAY_DELTA = 0.001
+
+_device_graphs = {}
+
+# qubits of the SWAP decompositions
+_SWAP_QUBITS = cirq.LineQubit.range(2)
+
+
+class DeviceGraph:
+    """Connectivity of a device with qubits numbered by index, the distances between all pairs of qubits, and
+    the decomposition of a SWAP gate into the native gates of the device."""
+
+    def __init__(self, graph: nx.Graph, gateset: cirq.CompilationTargetGateset = None):
+        self.qubits = sorted(graph.nodes)
+        self.index = {qubit: i for i, qubit in enumerate(self.qubits)}
+        self.neighbors = [sorted(self.index[n] for n in graph.neighbors(qubit)) for qubit in self.qubits]
+        self.distances = np.zeros((len(self.qubits), len(self.qubits)), dtype=np.int64)
+        for source, lengths in nx.all_pairs_shortest_path_length(graph):
+            for target, length in lengths.items():
+                self.distances[self.index[source], self.index[target]] = length
+        # the qubit with the smallest distance to all other qubits
+        self.center = int(np.argmin(self.distances.sum(axis=1)))
+        swap = cirq.Circuit(cirq.SWAP(*_SWAP_QUBITS))
+        if gateset is not None:
+            swap = cirq.optimize_for_target_gateset(swap, gateset=gateset)
+        self.swap_operations = list(swap.all_operations())
+
+    def swap(self, p1, p2):
+        """Return the operations swapping the device qubits with the given indices."""
+        qubit_map = {_SWAP_QUBITS[0]: self.qubits[p1], _SWAP_QUBITS[1]: self.qubits[p2]}
+        return [operation.transform_qubits(qubit_map) for operation in self.swap_operations]
+
+
+def get_device_graph(qpu_name, device, gateset=None):
+    """Return the device graph of the given device. It is computed once per process and qpu."""
+    key = qpu_name.lower()
+    graph = _device_graphs.get(key)
+    monitoring.observe_cache_lookup('device_graph', graph is not None)
+    if graph is None:
+        graph = _device_graphs[key] = DeviceGraph(device.metadata.nx_graph, gateset)
+    return graph
+
+
+def route_circuit(circuit: cirq.Circuit, device: DeviceGraph):
+    """Place the qubits of the circuit on the device and insert SWAP gates, so all two-qubit gates act on
+    neighboring qubits. The SWAP gates are decomposed into the gateset of the device graph. The circuit must only
+    contain gates on at most two qubits, except for measurements.
+    Return the routed circuit and the number of inserted SWAP gates."""
+    operations = list(circuit.all_operations())
+    for operation in operations:
+        if len(operation.qubits) > 2 and not cirq.is_measurement(operation):
+            raise ValueError(f"Operation {operation} acts on more than two qubits")
+
+    mapping = _initial_placement(operations, sorted(circuit.all_qubits()), device)
+    routed_operations, number_of_swaps = _route(operations, mapping, device)
+    return cirq.Circuit(routed_operations), number_of_swaps
+
+
+def _is_two_qubit_gate(operation):
+    return len(operation.qubits) == 2 and not cirq.is_measurement(operation)
+
+
+def _initial_placement(operations, logical_qubits, device):
+    """Map logical qubits to device qubits. Qubits that interact often are placed close to each other, starting
+    in the center of the device. Circuits that already use device qubits keep their placement."""
+    if len(logical_qubits) > len(device.qubits):
+        raise ValueError(f"Circuit uses {len(logical_qubits)} qubits, the device only has {len(device.qubits)}")
+    if all(qubit in device.index for qubit in logical_qubits):
+        return {qubit: device.index[qubit] for qubit in logical_qubits}
+
+    interactions = defaultdict(lambda: defaultdict(int))
+    for operation in operations:
+        if _is_two_qubit_gate(operation):
+            a, b = operation.qubits
+            interactions[a][b] += 1
+            interactions[b][a] += 1
+
+    mapping = {}
+    free = set(range(len(device.qubits)))
+    unplaced = list(logical_qubits)
+    while unplaced:
+        # place the qubit interacting most with the already placed qubits next, most interacting qubit first
+        qubit = max(unplaced, key=lambda q: (sum(n for p, n in interactions[q].items() if p in mapping),
+                                              sum(interactions[q].values())))
+        unplaced.remove(qubit)
+        partners = [(mapping[p], n) for p, n in interactions[qubit].items() if p in mapping]
+        if partners:
+            position = min(free, key=lambda f: (sum(n * device.distances[f, p] for p, n in partners), f))
+        else:
+            position = min(free, key=lambda f: (device.distances[device.center, f], f))
+        mapping[qubit] = position
+        free.remove(position)
+    return mapping
+
+
+def _route(operations, mapping, device):
+    """Route the operations with the SABRE heuristic. Operations are emitted as soon as all their predecessors are
+    emitted and their qubits are neighbors. Otherwise, the SWAP that reduces the distances of the front layer and
+    the upcoming gates the most is inserted."""
+    successors = [[] for _ in operations]
+    in_degree = [0] * len(operations)
+    last_operation = {}
+    for i, operation in enumerate(operations):
+        for predecessor in {last_operation[q] for q in operation.qubits if q in last_operation}:
+            successors[predecessor].append(i)
+            in_degree[i] += 1
+        for qubit in operation.qubits:
+            last_operation[qubit] = i
+
+    physical = dict(mapping)
+    logical = {p: q for q, p in mapping.items()}
+    decay = np.ones(len(device.qubits))
+    front = [i for i, degree in enumerate(in_degree) if degree == 0]
+    routed = []
+    number_of_swaps = 0
+    swaps_without_progress = 0
+
+    def is_executable(operation):
+        if not _is_two_qubit_gate(operation):
+            return True
+        a, b = operation.qubits
+        return device.distances[physical[a], physical[b]] == 1
+
+    def swap(p1, p2):
+        nonlocal number_of_swaps
+        q1, q2 = logical.pop(p1, None), logical.pop(p2, None)
+        if q1 is not None:
+            physical[q1] = p2
+            logical[p2] = q1
+        if q2 is not None:
+            physical[q2] = p1
+            logical[p1] = q2
+        routed.extend(device.swap(p1, p2))
+        number_of_swaps += 1
+
+    while front:
+        executable = [i for i in front if is_executable(operations[i])]
+        if executable:
+            front = [i for i in front if i not in executable]
+            for i in executable:
+                routed.append(operations[i].transform_qubits(lambda q: device.qubits[physical[q]]))
+                for successor in successors[i]:
+                    in_degree[successor] -= 1
+                    if in_degree[successor] == 0:
+                        front.append(successor)
+            decay[:] = 1
+            swaps_without_progress = 0
+            continue
+
+        if swaps_without_progress > 2 * len(device.qubits):
+            # the heuristic is stuck, move the qubits of the first gate next to each other along a shortest path
+            a, b = operations[front[0]].qubits
+            while device.distances[physical[a], physical[b]] > 1:
+                p = physical[a]
+                swap(p, min(device.neighbors[p], key=lambda n: device.distances[n, physical[b]]))
+            continue
+
+        front_pairs = [tuple(physical[q] for q in operations[i].qubits) for i in front]
+        extended_pairs = [tuple(physical[q] for q in operations[i].qubits)
+                          for i in _extended_set(front, successors, operations)]
+        candidates = sorted({tuple(sorted((p, n))) for pair in front_pairs for p in pair
+                             for n in device.neighbors[p]})
+
+        def score(candidate):
+            p1, p2 = candidate
+
+            def distance(pair):
+                a, b = (p2 if p == p1 else p1 if p == p2 else p for p in pair)
+                return device.distances[a, b]
+
+            cost = sum(distance(pair) for pair in front_pairs) / len(front_pairs)
+            if extended_pairs:
+                cost += EXTENDED_SET_WEIGHT * sum(distance(pair) for pair in extended_pairs) / len(extended_pairs)
+            return max(decay[p1], decay[p2]) * cost
+
+        p1, p2 = min(candidates, key=score)
+        swap(p1, p2)
+        decay[p1] += DECAY_DELTA
+        decay[p2] += DECAY_DELTA
+        swaps_without_progress += 1
+
+    return routed, number_of_swaps
+
+
+def _extended_set(front, successors, operations):
+    """Return the next two-qubit gates following the front layer in breadth-first order."""
+    extended = []
+    visited = set(front)
+    queue = list(front)
+    while queue and len(extended) < EXTENDED_SET_SIZE:
+        for successor in successors[queue.pop(0)]:
+            if successor not in visited:
+                visited.add(successor)
+                queue.append(successor)
+                if _is_two_qubit_gate(operations[successor]):
+                    extended.append(successor)
+    return extended[:EXTENDED_SET_SIZE]
@@ -0,0 +1,187 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import multiprocessing
+import os
+import resource
+import signal
+import threading
+
+import cirq
+
+from app import app, profiling
+
+
+class SandboxError(ValueError):
+    """The implementation failed, exceeded its resource limits, or did not return a circuit in time."""
+
+
+class _Worker:
+    """A pre-forked child process running implementations sent through a pipe."""
+
+    def __init__(self, context):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_loop,
+                                       args=(child_connection, self.connection, os.getpid(), dict(app.config)),
+                                       daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.jobs = 0
+
+    def stop(self):
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+
+
+class SandboxPool:
+    """Pool of child processes running user implementations with CPU time, memory, and wall-clock limits.
+    Workers are replaced after a fixed number of jobs, after a timeout, or when they crashed."""
+
+    def __init__(self, size, timeout, max_jobs_per_worker):
+        self.size = size
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        # fork, so the workers start with cirq and the app already imported
+        self.context = multiprocessing.get_context('fork')
+        self.lock = threading.Lock()
+        self.idle = [_Worker(self.context) for _ in range(size)]
+
+    def run(self, data, input_params, profile=False, profile_memory=False):
+        """Run the implementation in a worker and return its circuit. If profiling is requested, the implementation is
+        profiled in the worker and its profile is added to the enclosing profiled block."""
+        with self.lock:
+            worker = self.idle.pop() if self.idle else _Worker(self.context)
+        try:
+            worker.connection.send((data, input_params, profile, profile_memory))
+            if not worker.connection.poll(self.timeout):
+                raise SandboxError(f"Implementation did not finish within {self.timeout} seconds")
+            status, payload, child_profile = worker.connection.recv()
+        except (EOFError, OSError):
+            worker.stop()
+            raise SandboxError("Implementation exceeded its resource limits")
+        except BaseException:
+            worker.stop()
+            raise
+
+        worker.jobs += 1
+        with self.lock:
+            if worker.jobs >= self.max_jobs_per_worker:
+                worker.stop()
+                worker = _Worker(self.context)
+            if len(self.idle) < self.size:
+                self.idle.append(worker)
+            else:
+                worker.stop()
+
+        profiling.add_child_profile(child_profile)
+        if status == 'error':
+            raise SandboxError(payload)
+        return cirq.read_json(json_text=payload)
+
+
+_pool = None
+_pool_pid = None
+# whether idle sandbox processes are kept for later implementations, see use_single_process
+_keep_idle = True
+
+
+def use_single_process():
+    """Start a new sandbox process for every implementation instead of keeping a pool of idle ones. Used by the RQ
+    workers: every job runs in its own work horse, which exits after the job, so a pool would never be reused."""
+    global _keep_idle
+    _keep_idle = False
+
+
+def run(data, input_params, profile=False, profile_memory=False):
+    """Run the implementation in the sandbox pool of this process and return its circuit."""
+    global _pool, _pool_pid
+    # a forked process must not use the pipes of its parent's pool
+    if _pool is None or _pool_pid != os.getpid():
+        # a pool without idle processes starts one per implementation and stops it afterwards
+        _pool = SandboxPool(app.config['SANDBOX_POOL_SIZE'] if _keep_idle else 0, app.config['SANDBOX_TIMEOUT'],
+                            app.config['SANDBOX_MAX_JOBS_PER_WORKER'])
+        _pool_pid = os.getpid()
+    return _pool.run(data, input_params, profile, profile_memory)
+
+
+def _worker_loop(connection, parent_connection, parent_pid, config):
+    from app.implementation_handler import run_implementation
+
+    # the signal handlers of gunicorn or RQ must not keep the worker alive when the parent terminates it
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    parent_connection.close()
+
+    if config['SANDBOX_MEMORY_MB']:
+        memory = config['SANDBOX_MEMORY_MB'] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    while True:
+        try:
+            # other workers forked later hold a copy of this pipe, so also check if the parent is still alive
+            while not connection.poll(1):
+                if os.getppid() != parent_pid:
+                    return
+            data, input_params, profile, profile_memory = connection.recv()
+        except EOFError:
+            # the parent closed the pool
+            return
+
+        if config['SANDBOX_CPU_SECONDS']:
+            # the CPU time limit counts for the whole process, so it is moved forward for every job
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            limit = int(usage.ru_utime + usage.ru_stime) + config['SANDBOX_CPU_SECONDS']
+            hard_limit = resource.getrlimit(resource.RLIMIT_CPU)[1]
+            if hard_limit != resource.RLIM_INFINITY:
+                limit = min(limit, hard_limit)
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, hard_limit))
+
+        with profiling.profiled_child(profile, profile_memory) as child_profile:
+            try:
+                circuit = run_implementation(data, input_params)
+                message = ('ok', _serialize(circuit))
+            except MemoryError:
+                message = ('error', "Implementation exceeded the memory limit")
+            except Exception as e:
+                message = ('error', f"{type(e).__name__}: {e}")
+        connection.send(message + (child_profile,))
+
+
+def _serialize(circuit):
+    """Return the circuit as compact Cirq-JSON. Gates defined in the implementation cannot be loaded outside of it,
+    so such gates are decomposed until only serializable gates are left."""
+    try:
+        return cirq.to_json(circuit, indent=None, separators=(',', ':'))
+    except Exception:
+        pass
+    try:
+        circuit = cirq.Circuit(cirq.decompose(circuit, keep=_is_serializable))
+    except ValueError:
+        raise ValueError("Circuit contains gates that can neither be serialized nor decomposed")
+    return cirq.to_json(circuit, indent=None, separators=(',', ':'))
+
+
+def _is_serializable(operation):
+    try:
+        cirq.read_json(json_text=cirq.to_json(operation))
+        return True
+    except Exception:
+        return False
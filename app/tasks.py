@@ -17,69 +17,270 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from app import implementation_handler, cirq_handler, db
+from app import implementation_handler, cirq_handler, monitoring, profiling, result_store, result_data, result_cache, \
+    backlog, mitigation
 from rq import get_current_job
+from rq.timeouts import JobTimeoutException
 
-from app.result_model import Result
+from app.transpilation_model import Transpilation
 import logging
-import json
-import base64
 import cirq
 
 
-def execute(impl_url, impl_data, impl_language, transpiled_cirq_json, input_params, token, qpu_name, shots, bearer_token: str):
-    """Create database entry for result. Get implementation code, prepare it, and execute it. Save result in db"""
+def execute(impl_url, impl_data, impl_language, transpiled_cirq_json, input_params, token, qpu_name, shots,
+            bearer_token: str, transpilation_id: str = None, profile=False, profile_memory=False,
+            result_type='counts', seed=None, mitigate=False):
+    """Get implementation code, prepare it, and execute it. Save result, timings, and profile in db"""
     job = get_current_job()
+    backlog.remove_pending(job.origin, job.get_id())
+    monitoring.observe_queue_wait(job)
+    timer = monitoring.StageTimer(on_stage=lambda stage: _report_progress(job, stage))
 
-    backend = cirq_handler.get_backend(qpu_name)
+    with profiling.profiled(profile, profile_memory) as profile_report:
+        try:
+            job_result = _execute(job.get_id(), impl_url, impl_data, impl_language, transpiled_cirq_json,
+                                  input_params, qpu_name, shots, bearer_token, transpilation_id, result_type, seed,
+                                  mitigate, timer, lambda fraction: _report_progress(job, 'simulate', fraction))
+        except JobTimeoutException:
+            logging.info('Job exceeded its timeout')
+            job_result = {'error': 'job timed out'}
+        except Exception:
+            # e.g., unresolved symbols or simulator errors, the result must be completed anyway
+            logging.exception('Executing the job failed')
+            job_result = {'error': 'execution failed'}
+
+    with timer.stage('commit'):
+        result_store.finalize(job.get_id(), job_result, timer.timings, profile_report)
+    logging.info('Stage timings: ' + str(timer.timings))
+
+
+def _execute(result_id, impl_url, impl_data, impl_language, transpiled_cirq_json, input_params, qpu_name, shots,
+             bearer_token, transpilation_id, result_type, seed, mitigate, timer, progress=None, backend=None):
+    """Get implementation code, prepare it, and execute it on the given backend, or a new backend for the qpu.
+    Return the histogram, the metadata of the array written to the data directory, or an error"""
+    try:
+        backend = backend or cirq_handler.get_backend(qpu_name, seed)
+    except NotImplementedError:
+        backend = None
     if not backend:
-        result = Result.query.get(job.get_id())
-        result.result = json.dumps({'error': 'qpu-name or token wrong'})
-        result.complete = True
-        db.session.commit()
+        return {'error': 'qpu-name or token wrong'}
 
     logging.info('Preparing implementation...')
-    circuit = None
-    if transpiled_cirq_json:
-        circuit = cirq.read_json(json_text=transpiled_cirq_json)
-    else:
-        if impl_url:
-            if impl_language.lower() == 'cirq-json':
-                circuit = implementation_handler.prepare_code_from_cirq_url(impl_url, bearer_token)
-            else:
-                circuit = implementation_handler.prepare_code_from_url(impl_url, input_params, bearer_token)
-        elif impl_data:
-            impl_data = base64.b64decode(impl_data.encode()).decode()
-            if impl_language.lower() == 'cirq-json':
-                circuit = implementation_handler.prepare_code_from_cirq_json(impl_data)
-            else:
-                circuit = implementation_handler.prepare_code_from_data(impl_data, input_params)
+    if transpilation_id:
+        transpiled_cirq_json = Transpilation.query.get(transpilation_id).transpiled_cirq_json
+    try:
+        impl = transpiled_cirq_json or implementation_handler.get_implementation(impl_url, impl_data, bearer_token,
+                                                                                 timer)
+    except JobTimeoutException:
+        raise
+    except Exception:
+        logging.exception('Downloading the implementation failed')
+        impl = None
+    if not impl:
+        return {'error': 'URL not found'}
+
+    # seeded executions are reproducible, so identical reruns are answered from the cache without preparing them
+    cache_key = None
+    if seed is not None and result_type not in result_data.ARRAY_RESULT_TYPES:
+        with timer.stage('cache'):
+            cache_key = result_cache.get_key([impl, None if transpiled_cirq_json else impl_language], input_params,
+                                             qpu_name, shots, seed, backend.noise, mitigate)
+            job_result = result_cache.get(cache_key)
+        if job_result is not None:
+            return job_result
+
+    try:
+        if transpiled_cirq_json:
+            circuit = cirq.read_json(json_text=transpiled_cirq_json)
+        else:
+            circuit = implementation_handler.prepare_implementation(impl, impl_language, input_params, timer)
+    except JobTimeoutException:
+        raise
+    except Exception:
+        logging.exception('Preparing the implementation failed')
+        circuit = None
     if not circuit:
-        result = Result.query.get(job.get_id())
-        result.result = json.dumps({'error': 'URL not found'})
-        result.complete = True
-        db.session.commit()
+        return {'error': 'URL not found'}
 
     logging.info('Start transpiling...')
     transpiled_circuit = circuit
     try:
         if not transpiled_cirq_json:
-            transpiled_circuit = cirq_handler.transpile_for_qpu(qpu_name, circuit)
+            with timer.stage('transpile'):
+                transpiled_circuit = cirq_handler.decompose_for_qpu(qpu_name, circuit)
+    except JobTimeoutException:
+        raise
     except Exception:
-        result = Result.query.get(job.get_id())
-        result.result = json.dumps({'error': 'Unsupported qpu'})
-        result.complete = True
-        db.session.commit()
+        return {'error': 'Unsupported qpu'}
 
     logging.info('Start executing...')
-    job_result = cirq_handler.execute_job(transpiled_circuit, shots, backend)
-    if job_result:
-        result = Result.query.get(job.get_id())
-        result.result = json.dumps(job_result)
-        result.complete = True
-        db.session.commit()
-    else:
-        result = Result.query.get(job.get_id())
-        result.result = json.dumps({'error': 'execution failed'})
-        result.complete = True
-        db.session.commit()
+    monitoring.observe_circuit(len(transpiled_circuit.all_qubits()), len(transpiled_circuit), shots)
+    if result_type in result_data.ARRAY_RESULT_TYPES:
+        try:
+            array, qubits = cirq_handler.simulate_array(transpiled_circuit, result_type, backend, timer)
+        except (TypeError, ValueError):
+            logging.exception('Simulating the circuit failed')
+            return {'error': 'circuit has no ' + result_type}
+        with timer.stage('write'):
+            metadata = result_data.write(result_id, array, square=result_type == 'probabilities')
+        return dict(metadata, qubits=qubits, data='/cirq-service/api/v1.0/results/' + result_id + '/data')
+
+    mitigate_readout = _get_readout_mitigation(transpiled_circuit, qpu_name, backend, shots, timer) if mitigate \
+        else None
+    job_result = cirq_handler.execute_job(transpiled_circuit, shots, backend, timer, progress, mitigate_readout)
+    if not job_result:
+        return {'error': 'execution failed'}
+    if cache_key:
+        with timer.stage('cache'):
+            result_cache.put(cache_key, job_result)
+    return job_result
+
+
+def _get_readout_mitigation(circuit, qpu_name, backend, shots, timer):
+    """Get the calibration matrices of the measured qubits of the circuit, calibrating the missing ones, and return a
+    function correcting the readout errors of the histogram of the circuit."""
+    with timer.stage('calibrate'):
+        readout_qubits = mitigation.get_readout_qubits(circuit)
+        matrices = mitigation.get_calibration_matrices(qpu_name, backend,
+                                                       [qubit for qubit, _ in readout_qubits.values()])
+    readout_matrices = {key: mitigation.readout_matrix(matrices[str(qubit)], inverted)
+                        for key, (qubit, inverted) in readout_qubits.items()}
+
+    def mitigate_readout(histogram, keys):
+        return mitigation.mitigate(histogram, [readout_matrices[key] for key in keys], shots)
+    return mitigate_readout
+
+
+def execute_bundle(result_ids, circuits, qpu_name, bearer_token, seed=None, mitigate=False):
+    """Prepare and execute all circuits of a bundle one after another on the same backend. Save the results and
+    timings of all circuits in db with a single transaction"""
+    job = get_current_job()
+    backlog.remove_pending(job.origin, job.get_id())
+    monitoring.observe_queue_wait(job)
+
+    try:
+        # the simulator is created once and its random state carries over from circuit to circuit
+        backend = cirq_handler.get_backend(qpu_name, seed)
+    except NotImplementedError:
+        backend = None
+
+    job_results = {}
+    timings = {}
+    try:
+        for number, (result_id, circuit) in enumerate(zip(result_ids, circuits)):
+            _report_progress(job, 'bundle', number / len(result_ids))
+            if not backend:
+                job_results[result_id] = {'error': 'qpu-name or token wrong'}
+                continue
+            timer = monitoring.StageTimer()
+            try:
+                # the histograms are not cached, as they depend on the circuits executed before them in the bundle
+                job_results[result_id] = _execute(result_id, circuit.get('impl_url'), circuit.get('impl_data'),
+                                                  circuit.get('impl_language'), circuit.get('transpiled_cirq_json'),
+                                                  circuit.get('input_params', ""), qpu_name, circuit['shots'],
+                                                  bearer_token, circuit.get('transpilation_id'), 'counts', None,
+                                                  mitigate, timer, backend=backend)
+            except JobTimeoutException:
+                raise
+            except Exception:
+                # a failing circuit must not keep the other circuits of the bundle from completing
+                logging.exception('Executing circuit ' + str(number) + ' of the bundle failed')
+                job_results[result_id] = {'error': 'execution failed'}
+            timings[result_id] = timer.timings
+    except JobTimeoutException:
+        logging.info('Bundle exceeded its timeout')
+    for result_id in result_ids:
+        job_results.setdefault(result_id, {'error': 'job timed out'})
+
+    _report_progress(job, 'commit')
+    timer = monitoring.StageTimer()
+    with timer.stage('commit'):
+        result_store.finalize_all(job_results, timings)
+    logging.info('Stored the results of ' + str(len(result_ids)) + ' circuits')
+
+
+def _report_progress(job, stage, fraction=None):
+    """Store the current stage of the job and the fraction of it that is done in the meta data of the RQ job."""
+    if job is None:
+        return
+    job.meta['progress'] = {'stage': stage, 'fraction': fraction}
+    job.save_meta()
+
+
+def calculate_calibration_matrix(qpu_name, qubits, shots):
+    """Calibrate the readout of the given qubits, or of all qubits of the qpu, and save the matrices in db and in the
+    calibration cache"""
+    job = get_current_job()
+    backlog.remove_pending(job.origin, job.get_id())
+    monitoring.observe_queue_wait(job)
+    timer = monitoring.StageTimer(on_stage=lambda stage: _report_progress(job, stage))
+
+    try:
+        job_result = _calculate_calibration_matrix(qpu_name, qubits, shots, timer)
+    except JobTimeoutException:
+        logging.info('Job exceeded its timeout')
+        job_result = {'error': 'job timed out'}
+    except Exception:
+        logging.exception('Calibrating the qubits failed')
+        job_result = {'error': 'calibration failed'}
+
+    with timer.stage('commit'):
+        result_store.finalize(job.get_id(), job_result, timer.timings)
+
+
+def _calculate_calibration_matrix(qpu_name, qubits, shots, timer):
+    try:
+        backend = cirq_handler.get_backend(qpu_name)
+        if qubits:
+            qubits = [mitigation.parse_qubit(qubit) for qubit in qubits]
+        else:
+            qubits = sorted(cirq_handler.get_qpu_spec(qpu_name).metadata.qubit_set)
+    except NotImplementedError:
+        return {'error': 'Unsupported qpu'}
+
+    with timer.stage('calibrate'):
+        matrices = mitigation.get_calibration_matrices(qpu_name, backend, qubits, shots, refresh=True)
+    return {name: matrix.tolist() for name, matrix in matrices.items()}
+
+
+def transpile(impl_url, impl_data, impl_language, input_params, qpu_name, bearer_token: str, profile=False,
+              profile_memory=False):
+    """Get implementation code, prepare it, and transpile it for the given qpu. Save circuit, metrics, and profile
+    in db"""
+    job = get_current_job()
+    backlog.remove_pending(job.origin, job.get_id())
+    monitoring.observe_queue_wait(job)
+    timer = monitoring.StageTimer()
+
+    with profiling.profiled(profile, profile_memory) as profile_report:
+        metrics, transpiled_cirq_json = _transpile(impl_url, impl_data, impl_language, input_params, qpu_name,
+                                                   bearer_token, timer)
+
+    with timer.stage('commit'):
+        result_store.finalize_transpilation(job.get_id(), metrics, transpiled_cirq_json, profile_report)
+
+
+def _transpile(impl_url, impl_data, impl_language, input_params, qpu_name, bearer_token, timer):
+    """Get implementation code, prepare it, and transpile it for the given qpu. Return metrics or an error
+    together with the transpiled circuit as Cirq-JSON"""
+    logging.info('Preparing implementation...')
+    try:
+        circuit = implementation_handler.prepare_circuit(impl_url, impl_data, impl_language, input_params,
+                                                         bearer_token, timer)
+    except Exception:
+        circuit = None
+    if not circuit:
+        return {'error': 'URL not found'}, None
+
+    logging.info('Start transpiling...')
+    try:
+        with timer.stage('transpile'):
+            transpiled_circuit, routing_metrics = cirq_handler.transpile_for_qpu(qpu_name, circuit)
+        metrics = dict(cirq_handler.get_circuit_metrics(transpiled_circuit), **routing_metrics)
+    except NotImplementedError:
+        return {'error': 'Unsupported qpu'}, None
+    except Exception:
+        logging.exception('Transpilation failed')
+        return {'error': 'transpilation failed'}, None
+
+    return metrics, cirq.to_json(transpiled_circuit, indent=4)
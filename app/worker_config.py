@@ -0,0 +1,32 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+"""Settings of the RQ workers, used with ``rq worker -c app.worker_config``.
+
+RQ forks a work horse for every job. Importing the tasks here loads Cirq once in the worker process, so the work
+horses inherit it instead of importing it for every job.
+"""
+import app.tasks  # noqa: F401
+from app import monitoring, sandbox
+from app.config import Config
+
+monitoring.register_worker()
+sandbox.use_single_process()
+
+REDIS_URL = Config.REDIS_URL
+QUEUES = ['cirq-service_execute', 'cirq-service_transpile']
@@ -0,0 +1,313 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+"""Benchmark suite for the transpile and execute pipelines of the Cirq Service.
+
+Run it from the repository root, e.g.::
+
+    python benchmarks/benchmark.py --output bench.json
+    python benchmarks/benchmark.py --quick --compare bench.json --threshold 0.2
+    python benchmarks/benchmark.py --filter import
+
+The results are written in the JSON layout of pytest-benchmark. With ``--compare`` the run fails, if the mean of a
+benchmark is slower than in the given baseline by more than the threshold.
+"""
+import argparse
+import base64
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# the service has to be configured before the app is imported
+_data_dir = tempfile.mkdtemp(prefix='cirq-service-benchmark-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_data_dir, 'app.db')
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT_DIR)
+
+import cirq
+import fakeredis
+import rq
+
+from app import app, db, cirq_handler, implementation_handler, parameters
+
+SAMPLE_IMPLEMENTATION = '''
+import cirq
+
+
+def get_circuit(qubits: int, depth: int):
+    q = cirq.LineQubit.range(qubits)
+    circuit = cirq.Circuit(cirq.H.on_each(*q))
+    for layer in range(depth):
+        circuit.append(cirq.CNOT(q[i], q[i + 1]) for i in range(layer % 2, qubits - 1, 2))
+        circuit.append(cirq.rz(0.1 * (layer + 1)).on_each(*q))
+    circuit.append(cirq.measure(*q, key='result'))
+    return circuit
+'''
+
+
+def random_circuit(qubits, depth, seed=42):
+    """Return a reproducible random circuit with a final measurement of all qubits."""
+    circuit = cirq.testing.random_circuit(cirq.LineQubit.range(qubits), n_moments=depth, op_density=0.8,
+                                          random_state=seed)
+    circuit.append(cirq.measure(*cirq.LineQubit.range(qubits), key='result'))
+    return circuit
+
+
+def bell_pairs_circuit(qubits):
+    """Return a circuit of independent Bell pairs with a final measurement of all qubits."""
+    q = cirq.LineQubit.range(qubits)
+    circuit = cirq.Circuit([cirq.H(q[i]) for i in range(0, qubits - 1, 2)],
+                           [cirq.CNOT(q[i], q[i + 1]) for i in range(0, qubits - 1, 2)])
+    circuit.append(cirq.measure(*q, key='result'))
+    return circuit
+
+
+class Benchmark:
+    def __init__(self, name, group, func, params=None, setup=None, extra_info=None):
+        self.name = name
+        self.group = group
+        self.func = func
+        self.params = params or {}
+        self.setup = setup
+        self.extra_info = extra_info
+
+    def run(self, rounds, warmup_rounds):
+        args = self.setup() if self.setup else ()
+        for _ in range(warmup_rounds):
+            self.func(*args)
+        durations = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            self.func(*args)
+            durations.append(time.perf_counter() - start)
+        return {
+            'name': self.name,
+            'fullname': self.group + '::' + self.name,
+            'group': self.group,
+            'params': self.params,
+            'extra_info': self.extra_info() if self.extra_info else {},
+            'stats': {
+                'min': min(durations),
+                'max': max(durations),
+                'mean': statistics.mean(durations),
+                'stddev': statistics.stdev(durations) if len(durations) > 1 else 0.0,
+                'median': statistics.median(durations),
+                'rounds': len(durations),
+                'ops': len(durations) / sum(durations) if sum(durations) else 0.0,
+                'data': durations,
+            },
+        }
+
+
+def transpile_benchmarks(quick):
+    sizes = [(4, 10), (8, 20)] if quick else [(4, 10), (8, 20), (12, 50), (16, 100)]
+    for qpu in ['Sycamore', 'Sycamore23']:
+        for qubits, depth in sizes:
+            circuit = random_circuit(qubits, depth)
+            yield Benchmark(f'transpile_for_qpu[{qpu}-{qubits}q-{depth}d]', 'transpile_for_qpu',
+                            lambda qpu=qpu, circuit=circuit: cirq_handler.transpile_for_qpu(qpu, circuit),
+                            {'qpu': qpu, 'qubits': qubits, 'depth': depth})
+
+
+def execute_benchmarks(quick):
+    qubit_counts = [4, 8] if quick else [4, 8, 12, 16, 20]
+    depths = [10] if quick else [10, 50]
+    shot_counts = [100, 1000] if quick else [100, 1000, 10000]
+    for qubits in qubit_counts:
+        for depth in depths:
+            circuit = random_circuit(qubits, depth)
+            for shots in shot_counts:
+                yield Benchmark(f'execute_job[{qubits}q-{depth}d-{shots}s]', 'execute_job',
+                                lambda circuit=circuit, shots=shots: cirq_handler.execute_job(
+                                    circuit, shots, cirq_handler.get_backend('local-simulator')),
+                                {'qubits': qubits, 'depth': depth, 'shots': shots})
+    # circuits of non-interacting qubit groups are sampled group by group
+    for qubits in ([8, 16] if quick else [8, 16, 24, 32]):
+        circuit = bell_pairs_circuit(qubits)
+        yield Benchmark(f'execute_job[bell-pairs-{qubits}q-1000s]', 'execute_job',
+                        lambda circuit=circuit: cirq_handler.execute_job(
+                            circuit, 1000, cirq_handler.get_backend('local-simulator')),
+                        {'qubits': qubits, 'shots': 1000})
+
+
+def prepare_code_benchmarks(quick):
+    input_params = parameters.ParameterDictionary({'qubits': {'rawValue': '8', 'type': 'Integer'},
+                                                   'depth': {'rawValue': '20', 'type': 'Integer'}})
+    yield Benchmark('prepare_code_from_data', 'prepare_code_from_data',
+                    lambda: implementation_handler.prepare_code_from_data(SAMPLE_IMPLEMENTATION, input_params))
+
+
+def parameter_benchmarks(quick):
+    for size in ([10, 1000] if quick else [10, 1000, 100000]):
+        raw = {f'param{i}': {'rawValue': str(i), 'type': ['Integer', 'Float', 'String'][i % 3]}
+               for i in range(size)}
+        yield Benchmark(f'ParameterDictionary[{size}]', 'ParameterDictionary',
+                        lambda raw=raw: parameters.ParameterDictionary(raw), {'size': size})
+        parameter_sets = [{'theta': {'rawValue': str(i / size), 'type': 'Float'},
+                           'layers': {'rawValue': str(i % 8), 'type': 'Integer'},
+                           'name': {'rawValue': 'sweep', 'type': 'String'}} for i in range(size)]
+        yield Benchmark(f'ParameterDictionary.convert_batch[{size}]', 'ParameterDictionary',
+                        lambda parameter_sets=parameter_sets: parameters.ParameterDictionary.convert_batch(
+                            parameter_sets), {'size': size})
+
+
+def round_trip_benchmarks(quick):
+    """Submit a circuit to /execute, process the queue with an in-process worker, and fetch the result."""
+    connection = fakeredis.FakeStrictRedis()
+    app.redis = connection
+    app.execute_queue = rq.Queue('cirq-service_execute', connection=connection)
+    app.transpile_queue = rq.Queue('cirq-service_transpile', connection=connection)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+
+    def round_trip(body):
+        response = client.post('/cirq-service/api/v1.0/execute', json=body)
+        rq.SimpleWorker([app.execute_queue], connection=connection).work(burst=True, logging_level="WARNING")
+        result = client.get(response.headers['Location']).get_json()
+        if not result['complete']:
+            raise RuntimeError('Job did not complete: ' + str(result))
+
+    for qubits in ([4] if quick else [4, 12]):
+        body = {'impl-data': base64.b64encode(SAMPLE_IMPLEMENTATION.encode()).decode(), 'impl-language': 'Cirq',
+                'qpu-name': 'local-simulator', 'shots': 1000,
+                'input-params': {'qubits': {'rawValue': str(qubits), 'type': 'Integer'},
+                                 'depth': {'rawValue': '10', 'type': 'Integer'}}}
+        yield Benchmark(f'execute_round_trip[{qubits}q]', 'execute_round_trip',
+                        lambda body=body: round_trip(body), {'qubits': qubits, 'shots': 1000})
+
+    def bundle_round_trip(circuits, bundled):
+        if bundled:
+            response = client.post('/cirq-service/api/v1.0/execute-bundle',
+                                   json={'qpu-name': 'local-simulator', 'circuits': circuits})
+            locations = response.get_json()['locations']
+        else:
+            locations = [client.post('/cirq-service/api/v1.0/execute',
+                                     json=dict(circuit, **{'qpu-name': 'local-simulator'})).headers['Location']
+                         for circuit in circuits]
+        rq.SimpleWorker([app.execute_queue], connection=connection).work(burst=True, logging_level="WARNING")
+        for location in locations:
+            if not client.get(location).get_json()['complete']:
+                raise RuntimeError('Job did not complete: ' + location)
+
+    # many tiny circuits, submitted one job per circuit or as a single bundle
+    for count in ([50] if quick else [50, 500]):
+        circuits = [{'transpiled-cirq-json': cirq.to_json(bell_pairs_circuit(2)), 'shots': 100}] * count
+        for bundled in [False, True]:
+            yield Benchmark(f'execute_round_trip[{"bundle" if bundled else "single"}-{count}x2q]',
+                            'execute_round_trip',
+                            lambda circuits=circuits, bundled=bundled: bundle_round_trip(circuits, bundled),
+                            {'circuits': count, 'qubits': 2, 'shots': 100, 'bundled': bundled})
+
+
+def import_module(module):
+    """Import the module in a new interpreter, like a freshly started API or worker process."""
+    subprocess.run([sys.executable, '-c', 'import ' + module], cwd=ROOT_DIR, check=True)
+
+
+def import_time(module):
+    """Return the cumulative import time of the module and of its ten slowest imports in seconds, as reported by
+    python -X importtime."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], cwd=ROOT_DIR,
+                             check=True, stderr=subprocess.PIPE, universal_newlines=True)
+    cumulative = {}
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, total, name = line[len('import time:'):].split('|')
+            cumulative.setdefault(name.strip(), int(total) / 1e6)
+    slowest = sorted((name for name in cumulative if name != module), key=cumulative.get, reverse=True)[:10]
+    return {'import_time': cumulative.get(module), 'slowest_imports': {name: cumulative[name] for name in slowest}}
+
+
+def import_benchmarks(quick):
+    # the API process must start without the quantum libraries, the worker process preloads them for its jobs
+    modules = ['app'] if quick else ['app', 'app.worker_config', 'cirq']
+    for module in modules:
+        yield Benchmark(f'import[{module}]', 'import', lambda module=module: import_module(module),
+                        {'module': module}, extra_info=lambda module=module: import_time(module))
+
+
+SUITES = [transpile_benchmarks, execute_benchmarks, prepare_code_benchmarks, parameter_benchmarks,
+          round_trip_benchmarks, import_benchmarks]
+
+
+def compare(results, baseline_file, threshold):
+    """Return the benchmarks whose mean is slower than in the baseline by more than the threshold."""
+    with open(baseline_file) as f:
+        baseline = {b['fullname']: b['stats']['mean'] for b in json.load(f)['benchmarks']}
+    regressions = []
+    for benchmark in results:
+        old_mean = baseline.get(benchmark['fullname'])
+        if old_mean and benchmark['stats']['mean'] > old_mean * (1 + threshold):
+            regressions.append((benchmark['fullname'], old_mean, benchmark['stats']['mean']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the transpile and execute pipelines of the Cirq Service.')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--rounds', type=int, default=5, help='measured rounds per benchmark')
+    parser.add_argument('--warmup-rounds', type=int, default=1, help='unmeasured rounds per benchmark')
+    parser.add_argument('--quick', action='store_true', help='only run a small set of problem sizes')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare the results with a previous JSON output')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative slowdown of the mean compared to the baseline')
+    args = parser.parse_args(argv)
+
+    results = []
+    for suite in SUITES:
+        for benchmark in suite(args.quick):
+            if args.filter not in benchmark.name:
+                continue
+            result = benchmark.run(args.rounds, args.warmup_rounds)
+            stats = result['stats']
+            print(f"{result['fullname']:<60} mean {stats['mean'] * 1000:10.3f} ms  "
+                  f"min {stats['min'] * 1000:10.3f} ms  stddev {stats['stddev'] * 1000:9.3f} ms")
+            results.append(result)
+
+    output = {
+        'machine_info': {'python_version': platform.python_version(), 'machine': platform.machine(),
+                         'processor': platform.processor(), 'system': platform.system(),
+                         'cirq_version': cirq.__version__},
+        'datetime': datetime.datetime.utcnow().isoformat(),
+        'version': '1.0',
+        'benchmarks': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for name, old_mean, new_mean in regressions:
+            print(f'REGRESSION {name}: {old_mean * 1000:.3f} ms -> {new_mean * 1000:.3f} ms')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
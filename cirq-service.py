@@ -18,4 +18,5 @@
 # ******************************************************************************
 
 from app import app, db
-from app.result_model import Result
\ No newline at end of file
+from app.result_model import Result
+from app.transpilation_model import Transpilation
@@ -0,0 +1,31 @@
+"""transpilation table
+
+Revision ID: 3b1f0c7a9d24
+Revises: e2f6e8c36cef
+Create Date: 2026-10-19 09:12:41.203517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0c7a9d24'
+down_revision = 'e2f6e8c36cef'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('transpilation',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('backend', sa.String(length=1200), nullable=True),
+    sa.Column('metrics', sa.Text(), nullable=True),
+    sa.Column('transpiled_cirq_json', sa.Text(), nullable=True),
+    sa.Column('complete', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('transpilation')
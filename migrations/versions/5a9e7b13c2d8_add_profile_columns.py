@@ -0,0 +1,28 @@
+"""add profile columns to result and transpilation table
+
+Revision ID: 5a9e7b13c2d8
+Revises: 8c4d2e61f0a7
+Create Date: 2026-10-19 13:47:02.664190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9e7b13c2d8'
+down_revision = '8c4d2e61f0a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('result', sa.Column('profile', sa.Text(), nullable=True))
+    op.add_column('transpilation', sa.Column('profile', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('result') as batch_op:
+        batch_op.drop_column('profile')
+    with op.batch_alter_table('transpilation') as batch_op:
+        batch_op.drop_column('profile')
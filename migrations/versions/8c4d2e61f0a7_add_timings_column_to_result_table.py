@@ -0,0 +1,25 @@
+"""add timings column to result table
+
+Revision ID: 8c4d2e61f0a7
+Revises: 3b1f0c7a9d24
+Create Date: 2026-10-19 11:03:27.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e61f0a7'
+down_revision = '3b1f0c7a9d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('result', sa.Column('timings', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('result') as batch_op:
+        batch_op.drop_column('timings')
@@ -0,0 +1,25 @@
+"""add result_type column to result table
+
+Revision ID: 9d3a6f20b4e1
+Revises: 5a9e7b13c2d8
+Create Date: 2026-10-19 15:21:36.408115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3a6f20b4e1'
+down_revision = '5a9e7b13c2d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('result', sa.Column('result_type', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('result') as batch_op:
+        batch_op.drop_column('result_type')
@@ -0,0 +1,25 @@
+"""add job_id column to result table
+
+Revision ID: b7e5c1d93a40
+Revises: 9d3a6f20b4e1
+Create Date: 2026-10-19 18:04:12.530921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e5c1d93a40'
+down_revision = '9d3a6f20b4e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('result', sa.Column('job_id', sa.String(length=36), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('result') as batch_op:
+        batch_op.drop_column('job_id')
@@ -0,0 +1,173 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+"""Scale local RQ worker processes of the Cirq Service with the backlog of its queues.
+
+Run it from the repository root next to the API, e.g.::
+
+    python scaler/scaler.py --url http://localhost:5018 --redis-url redis://localhost:5040 --max-workers 8
+
+The scaler polls ``GET /cirq-service/api/v1.0/backlog`` and starts enough workers to process the estimated pending
+work within ``--target-drain-time`` seconds, in addition to the workers that are busy. Workers that are no longer
+needed for ``--scale-down-delay`` seconds are stopped with SIGTERM, so they finish their current job first.
+Workers that are not started by the scaler, e.g., of docker-compose, are taken into account.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKLOG_PATH = '/cirq-service/api/v1.0/backlog'
+QUEUES = ['cirq-service_execute', 'cirq-service_transpile']
+
+
+def fetch_backlog(url, timeout=5):
+    with urllib.request.urlopen(url.rstrip('/') + BACKLOG_PATH, timeout=timeout) as response:
+        return json.load(response)
+
+
+def desired_workers(backlog, target_drain_time):
+    """Return the total number of workers needed to keep the busy workers running and to process the pending work
+    within the target drain time."""
+    needed = math.ceil(backlog['pending-work'] / target_drain_time) if backlog['pending-work'] > 0 else 0
+    if backlog['length'] and not needed:
+        needed = 1
+    # the oldest job waiting longer than the drain time means the workers cannot keep up with the estimates
+    if backlog['length'] and backlog['oldest-job-age'] > target_drain_time:
+        needed += 1
+    return backlog['busy-workers'] + needed
+
+
+class WorkerPool:
+    """Local worker processes started by the scaler."""
+
+    def __init__(self, command, workdir):
+        self.command = command
+        self.workdir = workdir
+        self.running = []
+        self.stopping = []
+
+    def reap(self):
+        """Forget workers that exited, e.g., after being stopped or because they crashed."""
+        for process in [process for process in self.running if process.poll() is not None]:
+            logging.warning('Worker %s exited with %s', process.pid, process.returncode)
+            self.running.remove(process)
+        self.stopping = [process for process in self.stopping if process.poll() is None]
+
+    def start(self, number):
+        for _ in range(number):
+            # a separate process group keeps Ctrl-C of the scaler from reaching the workers directly
+            process = subprocess.Popen(self.command, cwd=self.workdir, start_new_session=True)
+            logging.info('Started worker %s', process.pid)
+            self.running.append(process)
+
+    def stop(self, number):
+        for _ in range(min(number, len(self.running))):
+            # stop the newest workers first, SIGTERM lets rq finish the current job
+            process = self.running.pop()
+            process.send_signal(signal.SIGTERM)
+            logging.info('Stopping worker %s', process.pid)
+            self.stopping.append(process)
+
+    def shutdown(self, timeout):
+        self.stop(len(self.running))
+        deadline = time.monotonic() + timeout
+        for process in self.stopping:
+            try:
+                process.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.stopping = []
+
+
+def scale(pool, backlog, args, last_needed_at, now):
+    """Start or stop workers of the pool for the given backlog. Return the time the current number of workers was
+    last needed."""
+    # workers of the pool that are stopping are still registered until they finished their job
+    external_workers = max(backlog['workers'] - len(pool.running) - len(pool.stopping), 0)
+    target = desired_workers(backlog, args.target_drain_time) - external_workers
+    target = max(args.min_workers, min(args.max_workers, target))
+
+    if target >= len(pool.running):
+        pool.start(target - len(pool.running))
+        return now
+    if now - last_needed_at >= args.scale_down_delay:
+        pool.stop(len(pool.running) - target)
+        return now
+    return last_needed_at
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scale local RQ worker processes with the queue backlog of the '
+                                                 'Cirq Service.')
+    parser.add_argument('--url', default='http://localhost:5018', help='base URL of the Cirq Service API')
+    parser.add_argument('--redis-url', default=os.environ.get('REDIS_URL') or 'redis://localhost:5040',
+                        help='Redis URL passed to the started workers')
+    parser.add_argument('--worker-command',
+                        help='command starting a worker, defaults to rq worker for the Cirq Service queues')
+    parser.add_argument('--workdir', default=os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)),
+                        help='working directory of the workers, has to contain the app package')
+    parser.add_argument('--min-workers', type=int, default=0, help='minimum number of workers started by the scaler')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1,
+                        help='maximum number of workers started by the scaler')
+    parser.add_argument('--target-drain-time', type=float, default=60,
+                        help='seconds within which the estimated pending work should be processed')
+    parser.add_argument('--scale-down-delay', type=float, default=120,
+                        help='seconds workers have to be unneeded before they are stopped')
+    parser.add_argument('--interval', type=float, default=5, help='seconds between two backlog polls')
+    parser.add_argument('--shutdown-timeout', type=float, default=600,
+                        help='seconds to wait for the workers to finish their jobs on exit before they are killed')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    command = shlex.split(args.worker_command) if args.worker_command else \
+        ['rq', 'worker', '-c', 'app.worker_config', '--url', args.redis_url] + QUEUES
+    pool = WorkerPool(command, args.workdir)
+
+    stopped = []
+    signal.signal(signal.SIGTERM, lambda *_: stopped.append(True))
+    last_needed_at = time.monotonic()
+    try:
+        while not stopped:
+            pool.reap()
+            try:
+                backlog = fetch_backlog(args.url)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                logging.warning('Reading the backlog failed: %s', e)
+            else:
+                last_needed_at = scale(pool, backlog, args, last_needed_at, time.monotonic())
+                logging.debug('Backlog %s, %s workers', backlog, len(pool.running))
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown(args.shutdown_timeout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
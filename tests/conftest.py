@@ -0,0 +1,65 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import os
+import sys
+import tempfile
+
+# the service has to be configured before the app is imported
+_data_dir = tempfile.mkdtemp(prefix='cirq-service-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_data_dir, 'app.db')
+os.environ['RESULT_DATA_DIR'] = os.path.join(_data_dir, 'results')
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+import fakeredis
+import pytest
+import rq
+
+from app import app as flask_app, db
+
+API = '/cirq-service/api/v1.0'
+
+
+@pytest.fixture
+def app():
+    """The app with an in-memory Redis and an empty SQLite database."""
+    connection = fakeredis.FakeStrictRedis()
+    flask_app.redis = connection
+    flask_app.execute_queue = rq.Queue('cirq-service_execute', connection=connection,
+                                       default_timeout=flask_app.config['MAX_JOB_TIMEOUT'])
+    flask_app.transpile_queue = rq.Queue('cirq-service_transpile', connection=connection)
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def work(app):
+    """Process all queued jobs in this process."""
+    def work():
+        rq.SimpleWorker([app.execute_queue, app.transpile_queue], connection=app.redis).work(
+            burst=True, logging_level='WARNING')
+    return work
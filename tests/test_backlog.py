@@ -0,0 +1,94 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import pytest
+import rq
+from rq.registry import StartedJobRegistry
+
+from app import backlog
+
+
+def enqueue(queue, cost):
+    job = queue.enqueue('app.tasks.execute')
+    backlog.add_pending(queue, job.id, cost)
+    return job
+
+
+def test_backlog_of_queued_jobs(app):
+    enqueue(app.execute_queue, 1.5)
+    enqueue(app.execute_queue, 2.5)
+    enqueue(app.transpile_queue, 1)
+
+    result = backlog.get_backlog([app.execute_queue, app.transpile_queue])
+
+    execute_queue, transpile_queue = result['queues']
+    assert (execute_queue['length'], execute_queue['pending_work']) == (2, 4.0)
+    assert (transpile_queue['length'], transpile_queue['pending_work']) == (1, 1.0)
+    assert (result['length'], result['pending_work']) == (3, 5.0)
+    assert execute_queue['oldest_job_age'] >= 0.0
+    assert (result['workers'], result['busy_workers'], result['utilization']) == (0, 0, 0.0)
+
+
+def test_estimates_of_jobs_removed_from_the_queue_are_deleted(app):
+    # e.g., a job removed with rq empty, or an estimate stored for a job that was never queued
+    app.execute_queue.remove(enqueue(app.execute_queue, 1))
+    job = enqueue(app.execute_queue, 3)
+    backlog.add_pending(app.execute_queue, 'not-queued', 5)
+
+    result = backlog.get_backlog([app.execute_queue])
+
+    assert (result['length'], result['pending_work']) == (1, 3.0)
+    assert app.redis.hkeys(backlog.PENDING_WORK_KEY_PREFIX + app.execute_queue.name) == [job.id.encode()]
+
+
+def test_jobs_queued_before_their_estimate_is_stored_are_not_counted(app):
+    app.execute_queue.enqueue('app.tasks.execute')
+
+    result = backlog.get_backlog([app.execute_queue])
+
+    assert (result['length'], result['pending_work']) == (1, 0.0)
+
+
+def test_workers_and_busy_workers(app):
+    workers = [rq.Worker([app.execute_queue, app.transpile_queue], connection=app.redis, name=name)
+               for name in ('first', 'second')]
+    for worker in workers:
+        worker.register_birth()
+    job = app.execute_queue.enqueue('app.tasks.execute')
+    app.execute_queue.remove(job)
+    StartedJobRegistry(queue=app.execute_queue).add(job, ttl=60)
+
+    result = backlog.get_backlog([app.execute_queue, app.transpile_queue])
+
+    execute_queue, transpile_queue = result['queues']
+    assert (execute_queue['workers'], execute_queue['busy_workers'], execute_queue['utilization']) == (2, 1, 0.5)
+    assert (transpile_queue['workers'], transpile_queue['busy_workers']) == (2, 0)
+    assert (result['workers'], result['busy_workers'], result['utilization']) == (2, 1, 0.5)
+
+
+def test_backlog_endpoint(client, app):
+    enqueue(app.execute_queue, 2)
+
+    result = client.get('/cirq-service/api/v1.0/backlog').get_json()
+
+    assert (result['length'], result['pending-work']) == (1, 2.0)
+
+
+@pytest.mark.parametrize('shots, width, depth', [(None, None, None), (100, 2, None)])
+def test_jobs_of_unknown_size_cost_the_default(app, shots, width, depth):
+    assert backlog.estimate_cost(shots, width, depth) == app.config['DEFAULT_JOB_COST']
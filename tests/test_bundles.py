@@ -0,0 +1,76 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import cirq
+import sympy
+
+from app import result_store
+from tests.conftest import API
+
+QUBIT = cirq.LineQubit(0)
+X_CIRCUIT = {'transpiled-cirq-json': cirq.to_json(cirq.Circuit(cirq.X(QUBIT), cirq.measure(QUBIT, key='m'))),
+             'shots': 10}
+SYMBOL_CIRCUIT = {'transpiled-cirq-json': cirq.to_json(cirq.Circuit(cirq.rx(sympy.Symbol('theta')).on(QUBIT),
+                                                                    cirq.measure(QUBIT, key='m'))),
+                  'shots': 10}
+
+
+def submit(client, circuits):
+    response = client.post(API + '/execute-bundle', json={'qpu-name': 'local-simulator', 'circuits': circuits})
+    assert response.status_code == 202
+    return response.get_json()['locations']
+
+
+def get_results(client, locations):
+    return [client.get(location).get_json() for location in locations]
+
+
+def test_failing_circuit_does_not_affect_the_others(client, work):
+    locations = submit(client, [X_CIRCUIT, SYMBOL_CIRCUIT, X_CIRCUIT])
+    work()
+
+    results = get_results(client, locations)
+    assert all(result['complete'] for result in results)
+    assert [result['result'] for result in results] == [{'1': 10}, {'error': 'execution failed'}, {'1': 10}]
+
+
+def test_all_circuits_report_the_progress_of_the_bundle(client):
+    locations = submit(client, [X_CIRCUIT, X_CIRCUIT])
+
+    assert [result['progress']['status'] for result in get_results(client, locations)] == ['queued', 'queued']
+
+
+def test_cancelling_any_circuit_cancels_the_bundle(app, client, work):
+    locations = submit(client, [X_CIRCUIT, X_CIRCUIT, X_CIRCUIT])
+
+    response = client.delete(locations[1])
+    assert response.status_code == 200
+    assert len(app.execute_queue) == 0
+    work()
+
+    assert [result['result'] for result in get_results(client, locations)] == [{'error': 'job cancelled'}] * 3
+    assert client.delete(locations[2]).status_code == 409
+
+
+def test_bundle_does_not_overwrite_completed_circuits(client, work):
+    locations = submit(client, [X_CIRCUIT, X_CIRCUIT])
+    # e.g., the circuit was cancelled while the bundle was already running
+    result_store.finalize(locations[1].split('/')[-1], {'error': 'job cancelled'})
+    work()
+
+    assert [result['result'] for result in get_results(client, locations)] == [{'1': 10}, {'error': 'job cancelled'}]
@@ -0,0 +1,40 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import cirq
+
+from app import cirq_handler
+
+
+def bell_circuit():
+    qubits = cirq.LineQubit.range(2)
+    return cirq.Circuit(cirq.H(qubits[0]), cirq.CNOT(*qubits), cirq.measure(*qubits, key='m'))
+
+
+def test_transpile_for_qpus_replaces_a_broken_pool():
+    qpu_names = ['Sycamore', 'Sycamore23']
+    assert all('error' not in transpilation
+               for transpilation in cirq_handler.transpile_for_qpus(qpu_names, bell_circuit()))
+
+    # a child process dying, e.g., because it ran out of memory, breaks the pool
+    for process in cirq_handler._get_transpile_pool()._processes.values():
+        process.kill()
+
+    transpilations = cirq_handler.transpile_for_qpus(qpu_names, bell_circuit())
+    assert [transpilation['qpu_name'] for transpilation in transpilations] == qpu_names
+    assert all('error' not in transpilation for transpilation in transpilations)
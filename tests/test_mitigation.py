@@ -0,0 +1,80 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import itertools
+
+import numpy as np
+import pytest
+
+from app import mitigation
+
+# columns: prepared 0 and 1, rows: read 0 and 1
+MATRICES = [np.array([[0.9, 0.2], [0.1, 0.8]]), np.array([[0.95, 0.1], [0.05, 0.9]]),
+            np.array([[0.85, 0.05], [0.15, 0.95]])]
+
+
+def noisy_histogram(histogram, matrices):
+    """Expected counts after the readout errors of the given calibration matrices."""
+    noisy = {}
+    for bitstring, count in histogram.items():
+        for read in itertools.product('01', repeat=len(bitstring)):
+            probability = np.prod([matrix[int(r), int(b)] for matrix, r, b in zip(matrices, read, bitstring)])
+            noisy[''.join(read)] = noisy.get(''.join(read), 0.0) + count * probability
+    return noisy
+
+
+@pytest.mark.parametrize('histogram', [{'111': 1000}, {'010': 600, '101': 400}, {'000': 250, '011': 250, '110': 500}])
+def test_mitigate_inverts_a_known_confusion_matrix(histogram):
+    mitigated = mitigation.mitigate(noisy_histogram(histogram, MATRICES), MATRICES, 1000)
+
+    assert set(mitigated) == set(histogram)
+    for bitstring, count in histogram.items():
+        assert mitigated[bitstring] == pytest.approx(count, abs=1e-3)
+
+
+def test_mitigate_clips_negative_quasi_probabilities():
+    # fewer errors than the calibration predicts give negative quasi-probabilities
+    mitigated = mitigation.mitigate({'0': 950, '1': 50}, MATRICES[:1], 1000)
+
+    assert mitigated == {'0': 1000.0}
+
+
+def test_inverted_measurements_swap_the_outcomes():
+    matrix = mitigation.readout_matrix(MATRICES[0], inverted=True)
+    # an inverted measurement of a qubit prepared in 1 reads 0, which is read wrongly with the error of 1
+    mitigated = mitigation.mitigate(noisy_histogram({'0': 1000}, [matrix]), [matrix], 1000)
+
+    assert mitigated == pytest.approx({'0': 1000.0})
+    np.testing.assert_allclose(matrix, [[0.8, 0.1], [0.2, 0.9]])
+
+
+def test_sparse_mitigation_of_many_bits():
+    bits = mitigation.DENSE_MITIGATION_BITS + 4
+    # only the first two bits have readout errors, so the observed bitstrings contain all possible readouts
+    matrices = MATRICES[:2] + [np.eye(2)] * (bits - 2)
+    histogram = {'10' + '1' * (bits - 2): 700, '01' + '0' * (bits - 2): 300}
+    noisy = {}
+    for bitstring, count in histogram.items():
+        for read, noisy_count in noisy_histogram({bitstring[:2]: count}, MATRICES[:2]).items():
+            noisy[read + bitstring[2:]] = noisy_count
+
+    mitigated = mitigation.mitigate(noisy, matrices, 1000)
+
+    assert set(mitigated) == set(histogram)
+    for bitstring, count in histogram.items():
+        assert mitigated[bitstring] == pytest.approx(count, abs=1e-3)
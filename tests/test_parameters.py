@@ -0,0 +1,65 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import pytest
+
+from app.parameters import ParameterDictionary
+
+RAW_VALUES = ['1', ' 2 ', '3.5', '-0', '+4', '1e3', '0x10', '1_000', 'nan', 'inf', '', 'abc', '[1, 2]', '1, 2', 7, 7.9,
+              True, None, [1, 2], '99999999999999999999', 99999999999999999999, {'a': 1}]
+TYPES = ['String', 'Integer', 'Float', 'Complex', 'Json', 'FloatArray', 'IntegerArray', 'Unknown']
+
+
+def same(value, other):
+    # repr, so NumPy arrays and NaN compare by their values
+    return repr(value.tolist() if hasattr(value, 'tolist') else value) == \
+        repr(other.tolist() if hasattr(other, 'tolist') else other)
+
+
+@pytest.mark.parametrize('type', TYPES)
+@pytest.mark.parametrize('raw_value', RAW_VALUES)
+def test_convert_batch_agrees_with_single_conversion(type, raw_value):
+    parameters = {'x': {'rawValue': raw_value, 'type': type}}
+    single = ParameterDictionary(parameters)
+    # parameter sets of the same schema are converted column by column
+    batch, errors = ParameterDictionary.convert_batch([parameters, parameters])
+
+    for typed in batch:
+        assert bool(typed.errors) == bool(single.errors)
+        assert same(typed['x'], single['x'])
+    assert [error['index'] for error in errors] == ([0, 1] if single.errors else [])
+
+
+def test_convert_batch_reports_errors_with_their_index():
+    batch, errors = ParameterDictionary.convert_batch([
+        {'n': {'rawValue': '3', 'type': 'Integer'}},
+        {'n': {'rawValue': 'three', 'type': 'Integer'}},
+        'not an object'])
+
+    assert batch[0] == {'n': 3}
+    assert batch[1] == {'n': None}
+    assert [(error['index'], error['parameter']) for error in errors] == [(1, 'n'), (2, None)]
+
+
+def test_bundle_with_invalid_input_params_is_rejected(client):
+    response = client.post('/cirq-service/api/v1.0/execute-bundle', json={
+        'qpu-name': 'local-simulator',
+        'circuits': [{'impl-data': '', 'impl-language': 'Cirq',
+                      'input-params': {'n': {'rawValue': raw_value, 'type': 'Integer'}}} for raw_value in ['2', 'x']]})
+
+    assert response.status_code == 400
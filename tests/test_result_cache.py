@@ -0,0 +1,99 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import base64
+
+from app import implementation_handler, result_cache
+from app.parameters import ParameterDictionary
+
+API = '/cirq-service/api/v1.0'
+
+IMPLEMENTATION = base64.b64encode(b'''
+import cirq
+
+
+def get_circuit(n: int):
+    q = cirq.LineQubit.range(n)
+    return cirq.Circuit(cirq.H.on_each(*q), cirq.measure(*q, key='m'))
+''').decode()
+
+
+def execute(client, work, n, seed=7):
+    response = client.post(API + '/execute', json={
+        'impl-data': IMPLEMENTATION, 'impl-language': 'Cirq', 'qpu-name': 'Sycamore', 'shots': 50, 'seed': seed,
+        'input-params': {'n': {'rawValue': str(n), 'type': 'Integer'}}})
+    work()
+    return client.get(response.headers['Location']).get_json()
+
+
+def test_seeded_rerun_is_answered_before_preparing_the_implementation(client, work):
+    first = execute(client, work, 3)
+    rerun = execute(client, work, 3)
+
+    assert rerun['result'] == first['result']
+    assert 'prepare' in first['timings'] and 'transpile' in first['timings']
+    assert set(rerun['timings']) == {'cache'}
+
+
+def test_rerun_of_changed_implementation_behind_the_same_url_is_not_answered_from_the_cache(client, work,
+                                                                                          monkeypatch):
+    implementations = {'https://example.org/impl.py': base64.b64decode(IMPLEMENTATION).decode()}
+    monkeypatch.setattr(implementation_handler, '_download_code', lambda url, bearer_token: implementations[url])
+
+    def execute_url():
+        response = client.post(API + '/execute', json={
+            'impl-url': 'https://example.org/impl.py', 'impl-language': 'Cirq', 'qpu-name': 'Sycamore', 'shots': 50,
+            'seed': 7, 'input-params': {'n': {'rawValue': '2', 'type': 'Integer'}}})
+        work()
+        return client.get(response.headers['Location']).get_json()
+
+    first = execute_url()
+    assert set(execute_url()['timings']) == {'download', 'cache'}
+
+    implementations['https://example.org/impl.py'] = '''
+import cirq
+
+
+def get_circuit(n: int):
+    q = cirq.LineQubit.range(n)
+    return cirq.Circuit(cirq.X.on_each(*q), cirq.measure(*q, key='m'))
+'''
+    changed = execute_url()
+
+    assert 'prepare' in changed['timings']
+    assert changed['result'] != first['result']
+    assert changed['result'] == {'1': 50}
+
+
+def test_rerun_with_other_input_params_is_not_answered_from_the_cache(client, work):
+    execute(client, work, 3)
+    other = execute(client, work, 4)
+
+    assert 'prepare' in other['timings']
+
+
+def test_cache_key_of_typed_input_params():
+    implementation = [base64.b64decode(IMPLEMENTATION).decode(), 'Cirq']
+    angles = ParameterDictionary({'angles': {'rawValue': '[0.1, 0.2]', 'type': 'FloatArray'}})
+    same_angles = ParameterDictionary({'angles': {'rawValue': '0.1, 0.2', 'type': 'FloatArray'}})
+    other_angles = ParameterDictionary({'angles': {'rawValue': '[0.1, 0.3]', 'type': 'FloatArray'}})
+
+    key = result_cache.get_key(implementation, angles, 'Sycamore', 10, 1)
+    assert key == result_cache.get_key(implementation, same_angles, 'Sycamore', 10, 1)
+    assert key != result_cache.get_key(implementation, other_angles, 'Sycamore', 10, 1)
+    assert key != result_cache.get_key(implementation, angles, 'Sycamore', 10, 2)
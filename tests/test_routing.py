@@ -0,0 +1,69 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import cirq
+import numpy as np
+import pytest
+
+from app import cirq_handler
+
+
+def random_circuit(qubits, depth, seed):
+    circuit = cirq.testing.random_circuit(cirq.LineQubit.range(qubits), n_moments=depth, op_density=0.8,
+                                          gate_domain={cirq.CNOT: 2, cirq.CZ: 2, cirq.H: 1, cirq.T: 1},
+                                          random_state=seed)
+    return circuit + cirq.Circuit(cirq.measure(*sorted(circuit.all_qubits()), key='m'))
+
+
+def distribution(circuit):
+    """Probabilities of the values of the measured qubits, in the order of the measurement."""
+    measurement = next(op for op in circuit.all_operations() if cirq.is_measurement(op))
+    measured = list(measurement.qubits)
+    others = sorted(circuit.all_qubits() - set(measured))
+    state = cirq.final_state_vector(cirq.drop_terminal_measurements(circuit), qubit_order=measured + others,
+                                    dtype=np.complex128)
+    return (np.abs(state) ** 2).reshape(2 ** len(measured), -1).sum(axis=1)
+
+
+@pytest.mark.parametrize('qpu', ['Sycamore', 'Sycamore23'])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_routed_circuit_only_uses_device_connections(qpu, seed):
+    circuit = random_circuit(6, 12, seed)
+    routed_circuit, metrics = cirq_handler.transpile_for_qpu(qpu, circuit)
+
+    graph = cirq_handler.get_qpu_spec(qpu).metadata.nx_graph
+    for operation in routed_circuit.all_operations():
+        if len(operation.qubits) == 2 and not cirq.is_measurement(operation):
+            assert graph.has_edge(*operation.qubits)
+    assert metrics['number_of_swaps'] >= 0
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_routing_preserves_the_distribution(seed):
+    circuit = random_circuit(5, 10, seed)
+    routed_circuit, _ = cirq_handler.transpile_for_qpu('Sycamore23', circuit)
+
+    np.testing.assert_allclose(distribution(routed_circuit), distribution(circuit), atol=1e-6)
+
+
+def test_execution_does_not_route():
+    circuit = random_circuit(6, 12, 1)
+    decomposed_circuit = cirq_handler.decompose_for_qpu('Sycamore', circuit)
+
+    assert decomposed_circuit.all_qubits() == circuit.all_qubits()
+    np.testing.assert_allclose(distribution(decomposed_circuit), distribution(circuit), atol=1e-6)
@@ -0,0 +1,126 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import base64
+import multiprocessing
+
+import cirq
+import pytest
+
+from app import sandbox
+
+CUSTOM_GATE_IMPLEMENTATION = '''
+import cirq
+
+
+class Bell(cirq.Gate):
+    def _num_qubits_(self):
+        return 2
+
+    def _decompose_(self, qubits):
+        yield cirq.H(qubits[0])
+        yield cirq.CNOT(*qubits)
+
+
+def get_circuit():
+    q = cirq.LineQubit.range(3)
+    return cirq.Circuit(Bell().on(q[0], q[1]), cirq.CCX(*q), cirq.measure(*q, key='m'))
+'''
+
+OPAQUE_GATE_IMPLEMENTATION = '''
+import cirq
+
+
+class Opaque(cirq.Gate):
+    def _num_qubits_(self):
+        return 1
+
+
+def get_circuit():
+    return cirq.Circuit(Opaque().on(cirq.LineQubit(0)))
+'''
+
+
+IMPLEMENTATION = '''
+import cirq
+
+
+def get_circuit():
+    q = cirq.LineQubit.range(2)
+    return cirq.Circuit(cirq.H(q[0]), cirq.CNOT(*q), cirq.measure(*q, key='m'))
+'''
+
+
+@pytest.fixture
+def single_process(monkeypatch):
+    monkeypatch.setattr(sandbox, '_pool', None)
+    monkeypatch.setattr(sandbox, '_keep_idle', True)
+    sandbox.use_single_process()
+
+
+def test_only_unserializable_gates_are_decomposed(single_process):
+    circuit = sandbox.run(CUSTOM_GATE_IMPLEMENTATION, {})
+
+    q = cirq.LineQubit.range(3)
+    assert list(circuit.all_operations()) == [cirq.H(q[0]), cirq.CNOT(q[0], q[1]), cirq.CCX(*q),
+                                              cirq.measure(*q, key='m')]
+
+
+def test_gates_that_cannot_be_serialized_or_decomposed_fail(single_process):
+    with pytest.raises(sandbox.SandboxError, match='can neither be serialized nor decomposed'):
+        sandbox.run(OPAQUE_GATE_IMPLEMENTATION, {})
+
+
+def test_single_process_mode_keeps_no_idle_processes(single_process):
+    children = set(multiprocessing.active_children())
+    for _ in range(2):
+        circuit = sandbox.run(IMPLEMENTATION, {})
+        assert len(circuit.all_qubits()) == 2
+
+    assert sandbox._pool.idle == []
+    assert set(multiprocessing.active_children()) <= children
+
+
+SLOW_IMPLEMENTATION = '''
+import time
+
+import cirq
+
+
+def build_slowly(n):
+    time.sleep(0.05)
+    q = cirq.LineQubit.range(n)
+    return cirq.Circuit(cirq.H.on_each(*q), cirq.measure(*q, key='m'))
+
+
+def get_circuit():
+    return build_slowly(2)
+'''
+
+
+def test_profile_of_an_execution_contains_the_implementation(client, work, single_process):
+    response = client.post('/cirq-service/api/v1.0/execute', json={
+        'impl-data': base64.b64encode(SLOW_IMPLEMENTATION.encode()).decode(), 'impl-language': 'Cirq',
+        'qpu-name': 'Sycamore', 'shots': 10, 'input-params': {}, 'profile': True, 'profile-memory': True})
+    work()
+    profile = client.get(response.headers['Location'] + '/profile').get_json()
+
+    assert 'get_circuit' in profile['pstats'] and 'build_slowly' in profile['pstats']
+    assert any(line.startswith('get_circuit (') and ';build_slowly (' in line
+               for line in profile['collapsed'].splitlines())
+    assert profile['peak-memory'] > 0
@@ -0,0 +1,106 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import argparse
+import sys
+
+import pytest
+
+from scaler import scaler
+
+ARGS = argparse.Namespace(target_drain_time=60, min_workers=0, max_workers=4, scale_down_delay=120)
+
+
+def make_backlog(length=0, pending_work=0.0, oldest_job_age=0.0, workers=0, busy_workers=0):
+    return {'length': length, 'pending-work': pending_work, 'oldest-job-age': oldest_job_age, 'workers': workers,
+            'busy-workers': busy_workers}
+
+
+class FakePool:
+    def __init__(self, running=0, stopping=0):
+        self.running = list(range(running))
+        self.stopping = list(range(stopping))
+
+    def start(self, number):
+        self.running.extend(range(number))
+
+    def stop(self, number):
+        for _ in range(min(number, len(self.running))):
+            self.stopping.append(self.running.pop())
+
+
+@pytest.mark.parametrize('backlog, expected', [
+    (make_backlog(), 0),
+    (make_backlog(busy_workers=2), 2),
+    # queued jobs need a worker even if their estimated cost is zero
+    (make_backlog(length=2), 1),
+    (make_backlog(length=5, pending_work=130), 3),
+    (make_backlog(length=5, pending_work=130, busy_workers=2), 5),
+    (make_backlog(length=5, pending_work=130, oldest_job_age=61), 4),
+])
+def test_desired_workers(backlog, expected):
+    assert scaler.desired_workers(backlog, 60) == expected
+
+
+def test_scale_up_is_capped_by_max_workers():
+    pool = FakePool()
+
+    assert scaler.scale(pool, make_backlog(length=50, pending_work=600), ARGS, 0, 10) == 10
+    assert len(pool.running) == 4
+
+
+def test_scale_takes_external_workers_into_account():
+    pool = FakePool(running=1, stopping=1)
+    # one worker of the pool, one stopping worker of the pool, and two external workers are registered
+    backlog = make_backlog(length=10, pending_work=240, workers=4)
+
+    scaler.scale(pool, backlog, ARGS, 0, 10)
+
+    assert len(pool.running) == 2
+
+
+def test_scale_down_after_delay():
+    pool = FakePool(running=3)
+    backlog = make_backlog(length=1, pending_work=30, workers=3)
+
+    assert scaler.scale(pool, backlog, ARGS, 0, 100) == 0
+    assert len(pool.running) == 3
+    assert scaler.scale(pool, backlog, ARGS, 0, 120) == 120
+    assert (len(pool.running), len(pool.stopping)) == (1, 2)
+
+
+def test_scale_keeps_min_workers():
+    pool = FakePool(running=2)
+    args = argparse.Namespace(**dict(vars(ARGS), min_workers=1))
+
+    scaler.scale(pool, make_backlog(workers=2), args, 0, 120)
+
+    assert len(pool.running) == 1
+
+
+def test_worker_pool_of_local_processes():
+    pool = scaler.WorkerPool([sys.executable, '-c', 'import time; time.sleep(60)'], None)
+    pool.start(2)
+    processes = list(pool.running)
+    pool.stop(1)
+    assert (pool.running, pool.stopping) == (processes[:1], processes[1:])
+
+    pool.shutdown(timeout=5)
+
+    assert pool.running == [] and pool.stopping == []
+    assert all(process.returncode is not None for process in processes)
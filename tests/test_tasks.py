@@ -0,0 +1,102 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import cirq
+import pytest
+import sympy
+from rq.exceptions import NoSuchJobError
+
+from app import mitigation, result_store, routes
+from app.result_model import Result
+from tests.conftest import API
+
+
+def test_execution_error_completes_result(client, work):
+    qubit = cirq.LineQubit(0)
+    circuit = cirq.Circuit(cirq.rx(sympy.Symbol('theta')).on(qubit), cirq.measure(qubit, key='m'))
+    response = client.post(API + '/execute', json={'transpiled-cirq-json': cirq.to_json(circuit),
+                                                   'qpu-name': 'local-simulator', 'shots': 10})
+    assert response.status_code == 202
+
+    work()
+
+    result = client.get(response.headers['Location']).get_json()
+    assert result['complete']
+    assert result['result'] == {'error': 'execution failed'}
+
+
+def test_calibration_error_completes_result(client, work, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('simulator crashed')
+    monkeypatch.setattr(mitigation, 'get_calibration_matrices', fail)
+
+    response = client.post(API + '/calculate-calibration-matrix', json={'qpu-name': 'local-simulator',
+                                                                         'qubits': ['q(0)']})
+    work()
+
+    result = client.get(response.headers['Location']).get_json()
+    assert result['complete']
+    assert result['result'] == {'error': 'calibration failed'}
+
+
+def test_cancelled_execution_stays_cancelled(app, client, work):
+    qubit = cirq.LineQubit(0)
+    response = client.post(API + '/execute', json={
+        'transpiled-cirq-json': cirq.to_json(cirq.Circuit(cirq.X(qubit), cirq.measure(qubit, key='m'))),
+        'qpu-name': 'local-simulator', 'shots': 10})
+
+    assert client.delete(response.headers['Location']).status_code == 200
+    assert len(app.execute_queue) == 0
+    work()
+
+    result = client.get(response.headers['Location']).get_json()
+    assert result['complete']
+    assert result['result'] == {'error': 'job cancelled'}
+    assert client.delete(response.headers['Location']).status_code == 409
+    assert client.delete(API + '/results/unknown').status_code == 404
+
+
+def test_cancelling_a_job_completed_in_the_meantime_keeps_its_result(client, monkeypatch):
+    qubit = cirq.LineQubit(0)
+    response = client.post(API + '/execute', json={
+        'transpiled-cirq-json': cirq.to_json(cirq.Circuit(cirq.X(qubit), cirq.measure(qubit, key='m'))),
+        'qpu-name': 'local-simulator', 'shots': 10})
+    result_id = response.headers['Location'].rsplit('/', 1)[-1]
+
+    def complete_and_expire(job_id, connection):
+        # the worker completes the job after the cancellation checked the result
+        result_store.finalize(result_id, {'1': 10})
+        raise NoSuchJobError()
+    monkeypatch.setattr(routes.Job, 'fetch', complete_and_expire)
+
+    assert client.delete(response.headers['Location']).status_code == 409
+    assert client.get(response.headers['Location']).get_json()['result'] == {'1': 10}
+
+
+@pytest.mark.parametrize('buffer_size', [1, 2])
+def test_completion_does_not_overwrite_a_cancelled_result(app, monkeypatch, buffer_size):
+    monkeypatch.setitem(app.config, 'RESULT_BUFFER_SIZE', buffer_size)
+    result_store.create_pending(['cancelled', 'other'], 'local-simulator', 10)
+    assert result_store.finalize_all({'cancelled': {'error': 'job cancelled'}}) == 1
+
+    result_store.finalize('cancelled', {'1': 10})
+    result_store.finalize('other', {'0': 10})
+    result_store.flush()
+
+    results = {result.id: result.result for result in Result.query}
+    assert results == {'cancelled': '{"error": "job cancelled"}', 'other': '{"0": 10}'}